@@ -2,21 +2,60 @@
 Customer Onboarding API Routes
 Provides endpoints for customers to connect their Confluence instances
 """
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
+from functools import lru_cache
 from typing import Optional
-import sys
-import os
-
-# Add project root to path
-current_dir = os.path.dirname(os.path.abspath(__file__))
-project_root = os.path.dirname(os.path.dirname(current_dir))
-sys.path.insert(0, project_root)
+import aiohttp
+import hashlib
+import orjson
 
 from backend.core.config.confluence_config import ConfluenceConfigManager, onboard_customer
+from backend.connectors.confluence import AsyncConfluenceConnector
 
 router = APIRouter(prefix="/api/onboarding", tags=["Customer Onboarding"])
 
+@lru_cache(maxsize=1)
+def get_config_manager() -> ConfluenceConfigManager:
+    """Shared config manager, it only re-reads the config files when they change on disk"""
+    return ConfluenceConfigManager()
+
+def _is_not_modified(request: Request, etag: str) -> bool:
+    """True if the client's cached copy (If-None-Match) is still current"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    # The header may list several ETags, use "*", or carry weak W/ validators
+    candidates = [tag.strip() for tag in header.split(",")]
+    if "*" in candidates:
+        return True
+    return etag in (tag[2:] if tag.startswith("W/") else tag for tag in candidates)
+
+# Keep-alive session shared by connection tests, so repeated "Test Connection"
+# clicks reuse the TCP+TLS connection to Atlassian instead of a new handshake each time
+_probe_session: Optional[aiohttp.ClientSession] = None
+
+async def get_probe_session() -> aiohttp.ClientSession:
+    """Shared HTTP session for connection tests, created on first use"""
+    global _probe_session
+    if _probe_session is None or _probe_session.closed:
+        _probe_session = AsyncConfluenceConnector.create_session(max_connections=8)
+    return _probe_session
+
+@router.on_event("shutdown")
+async def close_probe_session():
+    """Close the shared connection-test session"""
+    if _probe_session is not None:
+        await _probe_session.close()
+
+@router.on_event("shutdown")
+def compact_customer_configs():
+    """Fold journaled config changes into the snapshot file on graceful shutdown"""
+    if get_config_manager.cache_info().currsize:
+        get_config_manager().compact()
+
 class ConfluenceCredentials(BaseModel):
     customer_id: str
     confluence_url: str
@@ -30,7 +69,10 @@ class OnboardingResponse(BaseModel):
     customer_id: Optional[str] = None
 
 @router.post("/confluence", response_model=OnboardingResponse)
-async def onboard_confluence_customer(credentials: ConfluenceCredentials):
+async def onboard_confluence_customer(
+    credentials: ConfluenceCredentials,
+    config_manager: ConfluenceConfigManager = Depends(get_config_manager)
+):
     """
     Onboard a new customer with their Confluence credentials
 
@@ -40,12 +82,15 @@ async def onboard_confluence_customer(credentials: ConfluenceCredentials):
     3. Provide their Confluence URL, email, and API token
     """
     try:
-        success = onboard_customer(
+        # Onboarding tests the connection and writes the config file, keep it off the event loop
+        success = await run_in_threadpool(
+            onboard_customer,
             customer_id=credentials.customer_id,
             confluence_url=credentials.confluence_url,
             username=credentials.username,
             api_token=credentials.api_token,
-            space_key=credentials.space_key
+            space_key=credentials.space_key,
+            config_manager=config_manager
         )
 
         if success:
@@ -67,14 +112,12 @@ async def onboard_confluence_customer(credentials: ConfluenceCredentials):
 async def test_confluence_connection(
     confluence_url: str,
     username: str,
-    api_token: str
+    api_token: str,
+    session: aiohttp.ClientSession = Depends(get_probe_session)
 ):
     """Test Confluence connection without saving credentials"""
-    config_manager = ConfluenceConfigManager()
-
-    is_valid = config_manager.test_confluence_connection(
-        confluence_url, username, api_token
-    )
+    async with AsyncConfluenceConnector(confluence_url, username, api_token, session=session) as connector:
+        is_valid = await connector.test_connection()
 
     return {
         "valid": is_valid,
@@ -82,61 +125,79 @@ async def test_confluence_connection(
     }
 
 @router.get("/customers")
-async def list_customers():
+async def list_customers(
+    request: Request,
+    config_manager: ConfluenceConfigManager = Depends(get_config_manager)
+):
     """List all onboarded customers"""
-    config_manager = ConfluenceConfigManager()
-    customers = config_manager.list_customers()
+    # The ETag follows the config files, so pollers skip the body while nothing changed
+    # (refreshing takes the config file lock, so it runs off the event loop)
+    etag = f'"{await run_in_threadpool(config_manager.state_tag)}"'
+    if _is_not_modified(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
 
-    return {
+    customers = await run_in_threadpool(config_manager.list_customers)
+
+    return ORJSONResponse({
         "customers": customers,
         "count": len(customers)
-    }
+    }, headers={"ETag": etag, "Cache-Control": "no-cache"})
 
 @router.delete("/customer/{customer_id}")
-async def remove_customer(customer_id: str):
+async def remove_customer(
+    customer_id: str,
+    config_manager: ConfluenceConfigManager = Depends(get_config_manager)
+):
     """Remove a customer configuration"""
-    config_manager = ConfluenceConfigManager()
-
-    if customer_id in config_manager.configs:
-        del config_manager.configs[customer_id]
-        config_manager.save_configs()
+    # Deleting locks and rewrites the config files, keep it off the event loop
+    if await run_in_threadpool(config_manager.delete_customer, customer_id):
         return {"success": True, "message": f"Customer {customer_id} removed"}
     else:
         raise HTTPException(status_code=404, detail="Customer not found")
 
+# Onboarding instructions are static, so they are serialized once at import time
+ONBOARDING_INSTRUCTIONS = {
+    "title": "How to Connect Your Confluence",
+    "steps": [
+        {
+            "step": 1,
+            "title": "Get your Confluence URL",
+            "description": "Find your Confluence URL (e.g., https://yourcompany.atlassian.net)"
+        },
+        {
+            "step": 2,
+            "title": "Create API Token",
+            "description": "Go to https://id.atlassian.com/manage-profile/security/api-tokens",
+            "details": "Click 'Create API token', give it a name, and copy the token"
+        },
+        {
+            "step": 3,
+            "title": "Test Connection",
+            "description": "Use the /test-connection endpoint to verify your credentials"
+        },
+        {
+            "step": 4,
+            "title": "Complete Onboarding",
+            "description": "Submit your credentials through the /confluence endpoint"
+        }
+    ],
+    "required_info": [
+        "Confluence URL",
+        "Email address (username)",
+        "API Token",
+        "Space Key (optional - specific space to focus on)"
+    ]
+}
+_INSTRUCTIONS_BODY = orjson.dumps(ONBOARDING_INSTRUCTIONS)
+_INSTRUCTIONS_HEADERS = {
+    "ETag": f'"{hashlib.md5(_INSTRUCTIONS_BODY).hexdigest()}"',
+    "Cache-Control": "public, max-age=3600"
+}
+
 # Add instructions endpoint
 @router.get("/instructions")
-async def get_onboarding_instructions():
+async def get_onboarding_instructions(request: Request):
     """Get step-by-step instructions for customers"""
-    return {
-        "title": "How to Connect Your Confluence",
-        "steps": [
-            {
-                "step": 1,
-                "title": "Get your Confluence URL",
-                "description": "Find your Confluence URL (e.g., https://yourcompany.atlassian.net)"
-            },
-            {
-                "step": 2,
-                "title": "Create API Token",
-                "description": "Go to https://id.atlassian.com/manage-profile/security/api-tokens",
-                "details": "Click 'Create API token', give it a name, and copy the token"
-            },
-            {
-                "step": 3,
-                "title": "Test Connection",
-                "description": "Use the /test-connection endpoint to verify your credentials"
-            },
-            {
-                "step": 4,
-                "title": "Complete Onboarding",
-                "description": "Submit your credentials through the /confluence endpoint"
-            }
-        ],
-        "required_info": [
-            "Confluence URL",
-            "Email address (username)",
-            "API Token",
-            "Space Key (optional - specific space to focus on)"
-        ]
-    }
\ No newline at end of file
+    if _is_not_modified(request, _INSTRUCTIONS_HEADERS["ETag"]):
+        return Response(status_code=304, headers=_INSTRUCTIONS_HEADERS)
+    return Response(content=_INSTRUCTIONS_BODY, media_type="application/json", headers=_INSTRUCTIONS_HEADERS)
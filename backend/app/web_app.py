@@ -5,46 +5,137 @@ FastAPI-based web server providing a Claude Code-like chat interface
 This file is the core backend of the entire web application
 """
 
-from fastapi import FastAPI, Request
-from fastapi.responses import HTMLResponse
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import HTMLResponse, ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+import anyio
 import asyncio
 import uvicorn
-import sys
 import os
+import time
+
+# backend is imported as a package, so run from the project root:
+#   python -m backend.app.web_app   (or source config/environment-setup.sh)
+from backend.core.agents.qa_agent import DEFAULT_OLLAMA_MODEL, QAAgent, get_agent
+from backend.app.onboarding_routes import router as onboarding_router
 
-# Add project root directory to Python path so we can import backend modules
 # Get current file path and go up two levels to get project root directory
 current_dir = os.path.dirname(os.path.abspath(__file__))
 project_root = os.path.dirname(os.path.dirname(current_dir))
-sys.path.insert(0, project_root)
-from backend.core.agents.qa_agent import QAAgent
 
 # 🏗️ Create FastAPI application instance
-app = FastAPI(title="Team Knowledge Agent")
+# JSON responses are serialized with orjson instead of the stdlib json module
+app = FastAPI(title="Team Knowledge Agent", default_response_class=ORJSONResponse)
 
-# 🔗 Import and include onboarding routes
-from onboarding_routes import router as onboarding_router
+# 🔗 Include onboarding routes
 app.include_router(onboarding_router)
 
-# 🤖 Initialize QA agent
-# Note: This will be initialized at application startup, ensure Ollama service is running
-qa_agent = None
+# 🤖 QA agent
+# Note: This is created on the first chat request, so the server starts accepting
+# traffic (and passes readiness probes) before ChromaDB and the Ollama model are
+# loaded. Set QA_AGENT_WARMUP=1 to build and warm it in the background right after
+# startup instead; every worker process then loads its own agent at boot.
+qa_agent: Optional[QAAgent] = None
+qa_agent_lock = asyncio.Lock()
+QA_AGENT_WARMUP = os.getenv("QA_AGENT_WARMUP", "0") == "1"
+
+# 🧵 Max number of worker threads for blocking QA agent work (anyio's default is 40)
+CHAT_THREAD_LIMIT = 100
+
+# 🗂️ LRU + TTL cache of recent answers: repeated questions skip the QA agent entirely.
+# Entries expire after RESPONSE_CACHE_TTL seconds, so answers pick up a re-ingested
+# knowledge base within that time. Keys are normalized like the query embedding
+# cache, so "What is web3?" and "what is  web3? " share an answer
+RESPONSE_CACHE_SIZE = 512
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "300"))
+response_cache: "OrderedDict[str, tuple]" = OrderedDict()
+response_cache_hits = 0
+
+def _response_cache_key(message: str) -> str:
+    return " ".join(message.split()).lower()
+
+def _response_cache_get(key: str) -> Optional[str]:
+    entry = response_cache.get(key)
+    if entry is None:
+        return None
+    if entry[0] < time.monotonic():
+        del response_cache[key]
+        return None
+    response_cache.move_to_end(key)
+    return entry[1]
+
+def _response_cache_put(key: str, answer: str):
+    response_cache[key] = (time.monotonic() + RESPONSE_CACHE_TTL, answer)
+    response_cache.move_to_end(key)
+    if len(response_cache) > RESPONSE_CACHE_SIZE:
+        response_cache.popitem(last=False)
 
 @app.on_event("startup")
 async def startup_event():
-    """Initialize QA agent when application starts"""
+    """Tune the threadpools when application starts"""
+    # Blocking QA agent work runs in worker threads, so raise the limits to let
+    # more concurrent chats be served instead of queueing:
+    # anyio's pool serves run_in_threadpool, the loop's default executor serves
+    # the vector search inside ask_async (asyncio.to_thread)
+    anyio.to_thread.current_default_thread_limiter().total_tokens = CHAT_THREAD_LIMIT
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=CHAT_THREAD_LIMIT))
+    # 🔥 Optionally build the QA agent and load the model without blocking startup
+    app.state.qa_agent_warmup = None
+    if QA_AGENT_WARMUP:
+        app.state.qa_agent_warmup = asyncio.create_task(get_qa_agent())
+        app.state.qa_agent_warmup.add_done_callback(_report_warmup_result)
+
+def _report_warmup_result(task: asyncio.Task):
+    """Retrieve the background warmup's outcome, so a failure is reported rather than lost"""
+    if not task.cancelled() and task.exception() is not None:
+        print(f"❌ QA Agent warmup failed: {task.exception()}")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop a warmup that is still running"""
+    warmup = app.state.qa_agent_warmup
+    if warmup is not None and not warmup.done():
+        warmup.cancel()
+
+async def get_qa_agent() -> Optional[QAAgent]:
+    """Initialize the QA agent on first use, returns None if initialization failed"""
     global qa_agent
-    try:
-        # Initialize QA agent using path relative to project root directory
-        chroma_path = os.path.join(project_root, "data", "chroma_db")
-        qa_agent = QAAgent(chroma_db_path=chroma_path, ollama_model="qwen3:4b")
-        print("✅ QA Agent initialized successfully")
-    except Exception as e:
-        print(f"❌ Failed to initialize QA Agent: {e}")
-        print("🔧 Make sure Ollama is running on http://localhost:11434")
+    if qa_agent is None:
+        async with qa_agent_lock:
+            # Another request may have finished initializing while we waited
+            if qa_agent is None:
+                try:
+                    # Initialize QA agent using path relative to project root directory
+                    chroma_path = os.path.join(project_root, "data", "chroma_db")
+                    # Set CHROMA_HOST (and CHROMA_PORT) to use a ChromaDB server instead
+                    # Set OLLAMA_NUM_GPU (e.g. 999) to offload all model layers to the GPU
+                    num_gpu = os.getenv("OLLAMA_NUM_GPU")
+                    qa_agent = await run_in_threadpool(
+                        get_agent,
+                        chroma_db_path=chroma_path,
+                        ollama_model=os.getenv("OLLAMA_MODEL", DEFAULT_OLLAMA_MODEL),
+                        chroma_host=os.getenv("CHROMA_HOST"),
+                        chroma_port=int(os.getenv("CHROMA_PORT", "8000")),
+                        num_gpu=int(num_gpu) if num_gpu else None
+                    )
+                    print("✅ QA Agent initialized successfully")
+                except Exception as e:
+                    print(f"❌ Failed to initialize QA Agent: {e}")
+                    print("🔧 Make sure Ollama is running on http://localhost:11434")
+                    return None
+                try:
+                    # Load the model into Ollama now rather than on the first question
+                    await run_in_threadpool(qa_agent.warmup)
+                    print("🔥 Ollama model loaded")
+                except Exception as e:
+                    print(f"⚠️ Ollama warmup failed: {e}")
+    return qa_agent
 
 # 📁 Configure static file service and template engine
 # This line is important! It tells FastAPI to serve static files for /static/ path
@@ -69,6 +160,10 @@ class ChatResponse(BaseModel):
     """
     response: str  # AI response content
 
+class AskRequest(BaseModel):
+    """Question sent to the /ask API"""
+    question: str
+
 # 🏠 Home route - provide chat interface
 @app.get("/", response_class=HTMLResponse)
 async def get_chat_interface(request: Request):
@@ -91,18 +186,31 @@ async def chat_endpoint(chat_message: ChatMessage):
     3. Process message and generate reply
     4. Return ChatResponse object, FastAPI automatically converts to JSON and returns to frontend
     """
+    global response_cache_hits
+
     # Extract and clean user message
     message = chat_message.message.strip()
 
+    # ♻️ Return a cached answer if this question was answered recently
+    cache_key = _response_cache_key(message)
+    cached = _response_cache_get(cache_key)
+    if cached is not None:
+        response_cache_hits += 1
+        return ChatResponse(response=cached)
+
     # 🤖 Use real QA agent to process message
     try:
-        if qa_agent is None:
+        agent = await get_qa_agent()
+        if agent is None:
             # If QA agent initialization failed, return error message
             response = "❌ AI service temporarily unavailable. Please ensure Ollama service is running."
         else:
-            # Call QA agent's ask method
-            result = qa_agent.ask(message)
+            # Call QA agent's async ask so the event loop keeps serving other
+            # requests while the LLM is generating (retrieval runs in a worker thread)
+            result = await agent.ask_async(message)
             response = result['answer']
+            # Only successful answers are cached, errors should be retried
+            _response_cache_put(cache_key, response)
     except Exception as e:
         # Handle errors during the call process
         print(f"Error calling QA agent: {e}")
@@ -113,6 +221,18 @@ async def chat_endpoint(chat_message: ChatMessage):
     # chat.js will receive this JSON and extract data.response
     return ChatResponse(response=response)
 
+# ❓ Ask API endpoint - full QA result for programmatic clients
+@app.post("/ask")
+async def ask_endpoint(ask_request: AskRequest):
+    """
+    Answer a question with the warm QA agent and return the full result:
+    answer, retrieved context, evidence and timestamp
+    """
+    agent = await get_qa_agent()
+    if agent is None:
+        raise HTTPException(status_code=503, detail="QA Agent is not available. Please ensure Ollama service is running.")
+    return await agent.ask_async(ask_request.question.strip())
+
 # 🚀 Application startup entry point
 if __name__ == "__main__":
     print("🚀 Starting Team Knowledge Agent Web Interface...")
@@ -120,4 +240,22 @@ if __name__ == "__main__":
     # Start uvicorn server
     # host="0.0.0.0" means accept connections from any IP
     # port=8001 means listen on port 8001
-    uvicorn.run(app, host="0.0.0.0", port=8001)
\ No newline at end of file
+    # The app is passed as an import string because uvicorn needs it to spawn
+    # multiple workers; "auto" picks uvloop/httptools when uvicorn[standard] is
+    # installed and falls back to asyncio/h11 otherwise
+    # Set WEB_CONCURRENCY to override the number of worker processes.
+    # Each worker loads its own QA agent (embedding model, ChromaDB client, Ollama
+    # warmup) and keeps its own response cache and query batcher, so memory grows
+    # by roughly one agent per worker. With the embedded ChromaDB the default is a
+    # single worker; with a ChromaDB server (CHROMA_HOST) the stores are shared
+    # and 2 * cores + 1 workers are started
+    default_workers = (os.cpu_count() or 1) * 2 + 1 if os.getenv("CHROMA_HOST") else 1
+    workers = int(os.getenv("WEB_CONCURRENCY", default_workers))
+    uvicorn.run(
+        "backend.app.web_app:app",
+        host="0.0.0.0",
+        port=8001,
+        workers=workers,
+        loop="auto",
+        http="auto"
+    )
\ No newline at end of file
@@ -1,21 +1,164 @@
 # connectors/confluence.py
 from atlassian import Confluence
-from typing import List, Dict
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import List, Dict, Iterator, Optional
+from aiolimiter import AsyncLimiter
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import aiohttp
+import asyncio
+import hashlib
+import html
+import logging
+import orjson
+import random
 import re
+import requests
+import threading
+import time
 from datetime import datetime
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+try:
+    from selectolax.parser import HTMLParser
+except ImportError:
+    HTMLParser = None
+
+try:
+    # RE2 is a linear-time DFA engine: no backtracking, no ReDoS on hostile pages
+    import re2 as _tag_regex
+except ImportError:
+    _tag_regex = re
+
+# Fallback tag pattern when selectolax is not installed, compiled once.
+# [^>]* scans forward in a single pass, unlike the backtracking lazy '<.*?>'
+_TAG_RE = _tag_regex.compile(r'<[^>]*>')
+
+# Code/macro bodies in storage format are wrapped in CDATA, which an HTML parser
+# would drop as a comment, so they are unwrapped before parsing
+_CDATA_RE = re.compile(r'<!\[CDATA\[(.*?)\]\]>', re.S)
+
+# Fields requested when listing pages: only what process_page_content reads.
+# body.storage is kept (rather than body.view) so macros stay unrendered and cheap
+PAGE_EXPAND = 'body.storage,version'
+
+# Endpoint used to check that credentials can reach the REST API
+CONNECTION_PROBE_PATH = 'rest/api/user/current'
+
+def confluence_api_url(url: str) -> str:
+    """
+    Base URL of the Confluence REST API for a site URL. Same rule as
+    atlassian-python-api: Confluence Cloud serves its REST API under /wiki
+    """
+    base_url = url.rstrip('/')
+    if 'atlassian.net' in base_url and not base_url.endswith('/wiki'):
+        base_url += '/wiki'
+    return base_url
+
+def _is_last_batch(batch: Dict) -> bool:
+    """A content listing ends with an empty batch or one without a next link"""
+    return not batch.get('results') or 'next' not in batch.get('_links', {})
+
+class _RequestPacer:
+    """Thread-safe pacing of synchronous requests to at most max_rate per second"""
+
+    def __init__(self, max_rate: float):
+        self._interval = 1 / max_rate
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next_slot, now)
+            self._next_slot = slot + self._interval
+        if slot > now:
+            time.sleep(slot - now)
+
+# Connection pool shared by every synchronous Confluence client in the process,
+# so connectors and connection tests reuse keep-alive TLS connections.
+# Rate-limited (429) and unavailable (503) GETs are retried, waiting for the server's
+# Retry-After when it sends one (exponential backoff otherwise), like the async
+# connector; once retries run out the last response is returned for raise_for_status
+SHARED_HTTP_ADAPTER = HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=20,
+    max_retries=Retry(
+        total=5,
+        backoff_factor=0.3,
+        status_forcelist=(429, 503),
+        allowed_methods=frozenset({'GET', 'HEAD'}),
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+)
+
+# On-disk cache of space listings, so repeated runs skip the slow space enumeration
+SPACES_CACHE_DIR = Path.home() / '.cache' / 'team-agent'
+
+def create_http_session() -> requests.Session:
+    """requests.Session backed by the shared connection pool"""
+    session = requests.Session()
+    session.mount('https://', SHARED_HTTP_ADAPTER)
+    session.mount('http://', SHARED_HTTP_ADAPTER)
+    return session
+
+def _html_to_text(content: str) -> str:
+    """Extract plain text from Confluence storage-format HTML"""
+    if not content:
+        return ''
+    if HTMLParser is not None:
+        # C HTML parser, also decodes entities
+        tree = HTMLParser(_CDATA_RE.sub(lambda m: html.escape(m.group(1), quote=False), content))
+        # Macro settings (<ac:parameter>, e.g. a code block's language) are not page text
+        for node in tree.tags('ac:parameter'):
+            node.decompose()
+        return tree.text(separator=' ', strip=True)
+    return _TAG_RE.sub('', _CDATA_RE.sub(r'\1', content))
 
 class ConfluenceConnector:
-    def __init__(self, url: str, username: str, api_token: str):
+    def __init__(self, url: str, username: str, api_token: str, max_rate: float = 10):
         self.confluence = Confluence(
             url=url,
             username=username,
-            password=api_token
+            password=api_token,
+            session=create_http_session()
         )
-        
-    def fetch_spaces(self) -> List[Dict]:
-        """Fetch all accessible spaces"""
-        spaces = self.confluence.get_all_spaces()
-        return spaces['results']
+        # Concurrent batch fetches share one pace, like AsyncConfluenceConnector's max_rate
+        self._pacer = _RequestPacer(max_rate)
+        # Keyed by site and credentials, so another user or a replaced token never
+        # reads a listing fetched with different permissions
+        account = hashlib.sha256(f"{url}\0{username}\0{api_token}".encode()).hexdigest()[:16]
+        self._spaces_cache = SPACES_CACHE_DIR / f"spaces-{account}.json"
+
+    def fetch_spaces(self, ttl: float = 0) -> List[Dict]:
+        """
+        Fetch all accessible spaces. By default every call asks the server, so connection
+        and permission checks see the current state. Callers that list spaces repeatedly
+        (e.g. diagnostics re-runs) can pass ttl to reuse a listing cached on disk for that
+        many seconds (by file mtime).
+        """
+        if ttl <= 0:
+            return self.confluence.get_all_spaces()['results']
+
+        path = self._spaces_cache
+        try:
+            if time.time() - path.stat().st_mtime < ttl:
+                return orjson.loads(path.read_bytes())
+        except (OSError, ValueError):
+            pass  # Missing or unreadable cache, fetch from the server
+
+        spaces = self.confluence.get_all_spaces()['results']
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(orjson.dumps(spaces))
+        except OSError:
+            pass  # The cache is best-effort
+        return spaces
     
     def fetch_pages(self, space_key: str, limit: int = 100) -> List[Dict]:
         """Fetch all pages in a space"""
@@ -23,10 +166,72 @@ class ConfluenceConnector:
             space_key, 
             start=0, 
             limit=limit,
-            expand='body.storage,version,ancestors'
+            expand=PAGE_EXPAND
         )
         return pages
-    
+
+    def _fetch_page_batch(self, space_key: str, start: int, limit: int, expand: str = PAGE_EXPAND) -> Dict:
+        """Fetch one batch of pages starting at the given offset, with its _links"""
+        self._pacer.wait()
+        return self.confluence.get('rest/api/content', params={
+            'spaceKey': space_key,
+            'type': 'page',
+            'start': start,
+            'limit': limit,
+            'expand': expand
+        })
+
+    def iter_pages(self, space_key: str, batch_size: int = 100, max_workers: int = 4,
+                   expand: str = PAGE_EXPAND) -> Iterator[Dict]:
+        """
+        Yield every page in a space, following start/limit pagination until a batch
+        comes back empty or without a next link.
+        The first batch is fetched alone: it shows whether there is more and how many
+        pages the server really returns per request (it may cap limit below
+        batch_size). Later offsets advance by that count, and up to max_workers of
+        these batches are then fetched concurrently (paced to max_rate requests per
+        second). The window rolls forward as each batch is handed out, so later
+        batches keep downloading while the caller processes earlier ones.
+        Pass expand='version' to list pages without downloading their bodies.
+        """
+        fetch_batch = partial(self._fetch_page_batch, space_key, limit=batch_size, expand=expand)
+        first = fetch_batch(0)
+        yield from first['results']
+        if _is_last_batch(first):
+            return
+
+        page_size = len(first['results'])
+        next_start = page_size
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pending = deque()
+            try:
+                while True:
+                    while len(pending) < max_workers:
+                        pending.append((next_start, executor.submit(fetch_batch, next_start)))
+                        next_start += page_size
+                    start, future = pending.popleft()
+                    batch = future.result()
+                    pages = batch['results']
+                    if _is_last_batch(batch):
+                        yield from pages
+                        return
+                    if len(pages) != page_size:
+                        # The server changed its page size, so the prefetched offsets no
+                        # longer line up: continue from where this batch actually ended
+                        for _, stale in pending:
+                            stale.cancel()
+                        pending.clear()
+                        page_size = len(pages)
+                        next_start = start + page_size
+                    else:
+                        # Keep max_workers batches in flight while the caller takes these pages
+                        pending.append((next_start, executor.submit(fetch_batch, next_start)))
+                        next_start += page_size
+                    yield from pages
+            finally:
+                for _, future in pending:
+                    future.cancel()
+
     def fetch_page_by_id(self, page_id: str) -> Dict:
         """Fetch page by specified ID"""
         page = self.confluence.get_page_by_id(
@@ -35,6 +240,62 @@ class ConfluenceConnector:
         )
         return page
 
+    def _fetch_page_if_exists(self, page_id: str) -> Optional[Dict]:
+        """Fetch one page (with PAGE_EXPAND), None if it was deleted meanwhile"""
+        self._pacer.wait()
+        try:
+            return self.confluence.get(f'rest/api/content/{page_id}', params={'expand': PAGE_EXPAND})
+        except requests.HTTPError as e:
+            if e.response is not None and e.response.status_code == 404:
+                return None
+            raise
+
+    def _fetch_pages_by_ids_batch(self, page_ids: List[str]) -> List[Dict]:
+        """
+        Fetch one batch of pages by ID with a CQL content search, following its next
+        links since the server may cap limit when bodies are expanded. IDs the search
+        still did not return are fetched one by one, so no requested page goes missing
+        """
+        self._pacer.wait()
+        result = self.confluence.get('rest/api/content/search', params={
+            'cql': f"id in ({','.join(str(page_id) for page_id in page_ids)})",
+            'limit': len(page_ids),
+            'expand': PAGE_EXPAND
+        })
+        pages = list(result['results'])
+        while not _is_last_batch(result):
+            self._pacer.wait()
+            # The next link is relative to the API base and carries the cursor and CQL
+            result = self.confluence.get(result['_links']['next'].lstrip('/'))
+            pages.extend(result['results'])
+
+        found_ids = {page['id'] for page in pages}
+        for page_id in page_ids:
+            if str(page_id) not in found_ids:
+                page = self._fetch_page_if_exists(str(page_id))
+                if page is not None:
+                    pages.append(page)
+        return pages
+
+    def iter_pages_by_ids(self, page_ids: List[str], batch_size: int = 100, max_workers: int = 8) -> Iterator[Dict]:
+        """
+        Yield pages by ID, fetched with one CQL content search per batch_size IDs
+        instead of one fetch_page_by_id round-trip per page. Up to max_workers
+        batches are fetched concurrently, as in iter_pages.
+        """
+        batches = [page_ids[i:i + batch_size] for i in range(0, len(page_ids), batch_size)]
+        if len(batches) <= 1:
+            for batch in batches:
+                yield from self._fetch_pages_by_ids_batch(batch)
+            return
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(batches))) as executor:
+            for pages in executor.map(self._fetch_pages_by_ids_batch, batches):
+                yield from pages
+
+    def fetch_pages_by_ids(self, page_ids: List[str], batch_size: int = 100) -> List[Dict]:
+        """Fetch many pages by ID in bulk"""
+        return list(self.iter_pages_by_ids(page_ids, batch_size))
+
     def fetch_space_by_key(self, space_key: str) -> Dict:
         """Fetch specified space information"""
         space = self.confluence.get_space(space_key, expand='description,homepage')
@@ -44,7 +305,7 @@ class ConfluenceConnector:
         """Process page content and extract plain text"""
         content = page.get('body', {}).get('storage', {}).get('value', '')
         # Clean HTML tags
-        clean_content = re.sub('<.*?>', '', content)
+        clean_content = _html_to_text(content)
         
         return {
             'id': f"confluence_{page['id']}",
@@ -57,4 +318,172 @@ class ConfluenceConnector:
                 'last_modified': page['version']['when'],
                 'author': page['version']['by']['displayName']
             }
-        }
\ No newline at end of file
+        }
+
+
+class AsyncConfluenceConnector:
+    """
+    Non-blocking Confluence client sharing one pooled aiohttp session.
+    Use as an async context manager:
+
+        async with AsyncConfluenceConnector(url, username, api_token) as connector:
+            spaces = await connector.fetch_spaces()
+
+    Requests are capped at `concurrency` in flight and `max_rate` per second, pause
+    when Confluence reports the rate limit is (nearly) exhausted, and 429 responses
+    are retried with exponential backoff and jitter.
+
+    Pass a long-lived `session` (see create_session) to reuse its keep-alive
+    connections across connectors; it is then left open on exit.
+    """
+
+    def __init__(self, url: str, username: str, api_token: str, max_connections: int = 32,
+                 concurrency: int = 16, max_rate: float = 10, max_retries: int = 5,
+                 session: Optional[aiohttp.ClientSession] = None):
+        self.url = confluence_api_url(url)
+        self._auth = aiohttp.BasicAuth(username, api_token)
+        self._max_connections = max_connections
+        self._concurrency = concurrency
+        self._max_rate = max_rate
+        self._max_retries = max_retries
+        self._session = session
+        self._owns_session = session is None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._limiter: Optional[AsyncLimiter] = None
+        self._paused_until = 0.0
+
+    @staticmethod
+    def create_session(max_connections: int = 32, keepalive_timeout: float = 75) -> aiohttp.ClientSession:
+        """
+        Pooled keep-alive session; credentials are sent per request so it can be shared.
+        Every request goes to the one Confluence host, so the whole pool may serve it
+        (limit_per_host == limit), and idle connections are kept for keepalive_timeout
+        seconds (aiohttp's default is 15) so they survive the pauses between batches.
+        """
+        return aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=max_connections, limit_per_host=max_connections,
+                                           ttl_dns_cache=300, keepalive_timeout=keepalive_timeout),
+            timeout=aiohttp.ClientTimeout(total=30)
+        )
+
+    async def __aenter__(self) -> "AsyncConfluenceConnector":
+        if self._owns_session:
+            self._session = self.create_session(self._max_connections)
+        self._semaphore = asyncio.Semaphore(self._concurrency)
+        self._limiter = AsyncLimiter(self._max_rate, time_period=1)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        if self._owns_session:
+            await self._session.close()
+            self._session = None
+
+    @staticmethod
+    def _retry_after(headers) -> Optional[float]:
+        """Seconds to wait from a Retry-After header, if it holds a number"""
+        try:
+            return float(headers['Retry-After'])
+        except (KeyError, ValueError):
+            return None
+
+    def _throttle(self, headers):
+        """Pause all requests when Confluence reports the rate limit is (nearly) used up"""
+        pause = self._retry_after(headers)
+        if pause is None and (headers.get('X-RateLimit-NearLimit') == 'true'
+                              or headers.get('X-RateLimit-Remaining') == '0'):
+            pause = 1.0
+        if pause:
+            loop_time = asyncio.get_running_loop().time()
+            self._paused_until = max(self._paused_until, loop_time + pause)
+
+    async def _get(self, path: str, params: Optional[Dict] = None) -> Dict:
+        for attempt in range(self._max_retries + 1):
+            async with self._semaphore:
+                delay = self._paused_until - asyncio.get_running_loop().time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                async with self._limiter:
+                    async with self._session.get(f"{self.url}/{path}", params=params, auth=self._auth) as response:
+                        self._throttle(response.headers)
+                        if response.status != 429 or attempt == self._max_retries:
+                            response.raise_for_status()
+                            # orjson parses the raw bytes directly, skipping the str decode
+                            return orjson.loads(await response.read())
+                        backoff = max(self._retry_after(response.headers) or 0, 2 ** attempt)
+            # Back off outside the semaphore so other requests can still run
+            await asyncio.sleep(backoff + random.uniform(0, 1))
+
+    async def test_connection(self) -> bool:
+        """Test if the credentials can access the Confluence REST API"""
+        try:
+            await self._get(CONNECTION_PROBE_PATH)
+            return True
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.warning("Connection test failed: %s", e)
+            return False
+        except orjson.JSONDecodeError:
+            # A 200 with an HTML body: wrong base URL, or an SSO/login page
+            logger.warning("Connection test failed: %s did not return JSON", self.url)
+            return False
+
+    async def fetch_spaces(self) -> List[Dict]:
+        """Fetch all accessible spaces"""
+        spaces = await self._get('rest/api/space')
+        return spaces['results']
+
+    async def _fetch_page_batch(self, space_key: str, start: int, limit: int) -> Dict:
+        """Fetch one batch of pages in a space, with its _links"""
+        return await self._get('rest/api/content', params={
+            'spaceKey': space_key,
+            'type': 'page',
+            'start': start,
+            'limit': limit,
+            'expand': PAGE_EXPAND
+        })
+
+    async def fetch_pages(self, space_key: str, start: int = 0, limit: int = 100) -> List[Dict]:
+        """Fetch one batch of pages in a space"""
+        batch = await self._fetch_page_batch(space_key, start, limit)
+        return batch['results']
+
+    async def fetch_all_pages(self, space_key: str, batch_size: int = 100, concurrency: int = 16) -> List[Dict]:
+        """
+        Fetch every page in a space until a batch comes back empty or without a next
+        link. As in ConfluenceConnector.iter_pages, the first batch alone tells the
+        server's real page size, then `concurrency` batches are requested at a time
+        """
+        first = await self._fetch_page_batch(space_key, 0, batch_size)
+        pages = list(first['results'])
+        if _is_last_batch(first):
+            return pages
+
+        page_size = len(first['results'])
+        start = page_size
+        while True:
+            starts = range(start, start + page_size * concurrency, page_size)
+            batches = await asyncio.gather(*[
+                self._fetch_page_batch(space_key, batch_start, batch_size) for batch_start in starts
+            ])
+            start += page_size * concurrency
+            for batch_start, batch in zip(starts, batches):
+                pages.extend(batch['results'])
+                if _is_last_batch(batch):
+                    return pages
+                if len(batch['results']) != page_size:
+                    # The server changed its page size: drop the misaligned batches
+                    # after this one and continue from where it actually ended
+                    page_size = len(batch['results'])
+                    start = batch_start + page_size
+                    break
+
+    async def fetch_page_by_id(self, page_id: str) -> Dict:
+        """Fetch page by specified ID"""
+        return await self._get(f'rest/api/content/{page_id}', params={
+            'expand': 'body.storage,version,ancestors,space'
+        })
+
+    async def fetch_space_by_key(self, space_key: str) -> Dict:
+        """Fetch specified space information"""
+        return await self._get(f'rest/api/space/{space_key}', params={
+            'expand': 'description,homepage'
+        })
@@ -1,24 +1,29 @@
-import sys
 import os
-from pathlib import Path
-from dotenv import load_dotenv
 
-# Force using absolute path to set project root directory
-project_root = Path(__file__).parent.parent.parent
-sys.path.insert(0, str(project_root))
+# Run this module from the project root: python -m backend.connectors.confluenceToJason
+from backend.core.config.settings import ENV_FILE, PROJECT_ROOT as project_root, get_confluence_env
+from backend.connectors.confluence import ConfluenceConnector
+from itertools import islice
+import hashlib
+import logging
+import orjson
+import re
+from typing import List, Dict, Iterator, Optional
 
-# Force using absolute path to load .env file
-load_dotenv(project_root / '.env', override=True)
+# Load environment variables (from the environment and the project .env file, parsed once)
+ENV = get_confluence_env()
+CONFLUENCE_URL = ENV.url
+USERNAME = ENV.username
+API_TOKEN = ENV.api_token
+PERSONAL_SPACE_KEY = ENV.personal_space_key
 
-from backend.connectors.confluence import ConfluenceConnector
-import json
-from typing import List, Dict
+log = logging.getLogger(__name__)
+
+# Output files with these extensions are written as newline-delimited JSON
+NDJSON_EXTENSIONS = ('.jsonl', '.ndjson')
 
-# Load environment variables
-CONFLUENCE_URL = os.getenv('CONFLUENCE_URL')
-USERNAME = os.getenv('CONFLUENCE_USERNAME')
-API_TOKEN = os.getenv('CONFLUENCE_API_TOKEN')
-PERSONAL_SPACE_KEY = os.getenv('CONFLUENCE_Software_development_KEY')
+# Version caches of exported pages, one file per Confluence site and space
+PAGE_CACHE_DIR = project_root / 'data' / 'page_cache'
 
 class FormConfluenceDataToPersist(ConfluenceConnector):
     def __init__(self, url: str = None, username: str = None, api_token: str = None):
@@ -46,136 +51,239 @@ class FormConfluenceDataToPersist(ConfluenceConnector):
             raise ValueError("Personal space key not configured")
         return self.fetch_pages(self.personal_space_key, limit)
 
-    def process_and_save_pages_to_json(self, space_key: str = None, output_file: str = "confluence_data.json") -> str:
-        """Process pages and save to JSON format"""
+    def page_cache_file(self, space_key: str) -> str:
+        """
+        Version cache file for a space of this Confluence site. Each space has its own
+        file because iter_processed_pages rewrites the cache from one space's listing
+        """
+        site = hashlib.sha256(self.confluence.url.encode()).hexdigest()[:16]
+        safe_space_key = re.sub(r'[^\w~-]', '_', space_key)
+        return str(PAGE_CACHE_DIR / f"{site}-{safe_space_key}.json")
+
+    @staticmethod
+    def _load_page_cache(cache_file: str) -> Dict:
+        """Read the {page_id: {'version', 'page'}} cache written by a previous run"""
+        try:
+            with open(cache_file, 'rb') as f:
+                return orjson.loads(f.read())
+        except FileNotFoundError:
+            return {}
+
+    @staticmethod
+    def _save_page_cache(cache_file: str, cache: Dict):
+        """Write the page cache atomically"""
+        os.makedirs(os.path.dirname(cache_file) or '.', exist_ok=True)
+        tmp_file = cache_file + '.tmp'
+        with open(tmp_file, 'wb') as f:
+            f.write(orjson.dumps(cache))
+        os.replace(tmp_file, cache_file)
+
+    def iter_processed_pages(self, space_key: str, cache_file: Optional[str] = None) -> Iterator[Dict]:
+        """
+        Yield processed pages of a space. With a cache_file, pages are first listed
+        with their version only; unchanged pages come from the cache and only new
+        or edited pages are downloaded (in bulk) and processed again.
+        """
+        if not cache_file:
+            for page in self.iter_pages(space_key):
+                yield self.process_page_content(page, space_key)
+            return
+
+        cache = self._load_page_cache(cache_file)
+        # Rebuilt from the current listing, so deleted pages drop out of the cache
+        fresh_cache = {}
+        changed_ids = []
+        for page in self.iter_pages(space_key, expand='version'):
+            cached = cache.get(page['id'])
+            if cached and cached['version'] == page['version']['number']:
+                fresh_cache[page['id']] = cached
+                yield cached['page']
+            else:
+                changed_ids.append(page['id'])
+
+        for page in self.iter_pages_by_ids(changed_ids):
+            processed_page = self.process_page_content(page, space_key)
+            fresh_cache[page['id']] = {'version': page['version']['number'], 'page': processed_page}
+            yield processed_page
+
+        self._save_page_cache(cache_file, fresh_cache)
+
+    def process_and_save_pages_to_json(self, space_key: str = None, output_file: str = "confluence_data.json",
+                                       use_page_cache: bool = True, cache_file: Optional[str] = None) -> str:
+        """
+        Process pages and save to JSON format, reusing cached pages whose version is unchanged.
+        The cache defaults to page_cache_file(space_key) under data/page_cache; pass
+        cache_file to use another path, or use_page_cache=False to fetch every page.
+        A .jsonl/.ndjson output_file is written as one JSON page per line instead of an array.
+        """
         target_space = space_key or self.personal_space_key
         if not target_space:
             raise ValueError("No space key provided and personal space key not configured")
+        if not use_page_cache:
+            cache_file = None
+        elif not cache_file:
+            cache_file = self.page_cache_file(target_space)
+
+        # Fetch all pages of the space (paginated, batches fetched concurrently)
+        pages = self.iter_processed_pages(target_space, cache_file)
+
+        # Stream each processed page straight to disk as it is produced,
+        # so memory stays bounded by one batch of pages
+        saved_count = 0
+        with open(output_file, 'wb') as f:
+            if output_file.endswith(NDJSON_EXTENSIONS):
+                # Newline-delimited JSON: one compact page per line, readable line by line
+                for processed_page in pages:
+                    f.write(orjson.dumps(processed_page, option=orjson.OPT_APPEND_NEWLINE))
+                    saved_count += 1
+            else:
+                # A regular (indented) JSON array, written element by element
+                f.write(b'[\n')
+                for processed_page in pages:
+                    if saved_count:
+                        f.write(b',\n')
+                    f.write(orjson.dumps(processed_page, option=orjson.OPT_INDENT_2))
+                    saved_count += 1
+                f.write(b'\n]')
 
-        # Fetch pages
-        pages = self.fetch_pages(target_space)
+        return f"Successfully saved {saved_count} pages to {output_file}"
 
-        # Process each page
-        processed_pages = []
-        for page in pages:
-            processed_page = self.process_page_content(page,target_space)
-            processed_pages.append(processed_page)
+    def process_and_store_pages(self, vector_store, space_key: str = None, batch_size: int = 64) -> int:
+        """
+        Fetch, clean and embed pages straight into a VectorStore in one pass,
+        skipping the intermediate JSON file. Only batch_size processed pages
+        are held in memory at a time. The vector store's collection must
+        already be created. Returns the number of pages stored.
+        """
+        target_space = space_key or self.personal_space_key
+        if not target_space:
+            raise ValueError("No space key provided and personal space key not configured")
 
-        # Save to JSON file
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(processed_pages, f, ensure_ascii=False, indent=2)
+        processed_pages = self.iter_processed_pages(target_space)
 
-        return f"Successfully saved {len(processed_pages)} pages to {output_file}"
+        stored_count = 0
+        while True:
+            batch = list(islice(processed_pages, batch_size))
+            if not batch:
+                break
+            # Content is embedded by the collection's embedding function on add
+            vector_store.add_documents(batch)
+            stored_count += len(batch)
+
+        return stored_count
 
 
 # Test code
 if __name__ == "__main__":
+    # %-style arguments are only formatted if the record is emitted (LOG_LEVEL=DEBUG shows diagnostics)
+    logging.basicConfig(level=os.getenv('LOG_LEVEL', 'INFO'), format='%(message)s')
+
     def test_confluence_connector():
         """Test Confluence connector functionality"""
         try:
-            print("🚀 Starting Confluence connector test...")
+            log.info("🚀 Starting Confluence connector test...")
 
             # Add environment diagnostics
-            print(f"\n🔍 Environment diagnostics:")
-            print(f"   📁 Working directory: {os.getcwd()}")
-            print(f"   📄 Script location: {__file__}")
-            print(f"   📁 Project root: {project_root}")
-            print(f"   📄 .env file: {project_root / '.env'}")
-            print(f"   🔧 URL config: {'Set' if CONFLUENCE_URL else 'Not set'}")
-            print(f"   👤 Username config: {'Set' if USERNAME else 'Not set'}")
-            print(f"   🔑 API Token: {'Set' if API_TOKEN else 'Not set'}")
-            print(f"   🏠 Personal space: {'Set' if PERSONAL_SPACE_KEY else 'Not set'}")
+            log.debug("\n🔍 Environment diagnostics:")
+            log.debug("   📁 Working directory: %s", os.getcwd())
+            log.debug("   📄 Script location: %s", __file__)
+            log.debug("   📁 Project root: %s", project_root)
+            log.debug("   📄 .env file: %s", ENV_FILE)
+            log.debug("   🔧 URL config: %s", 'Set' if CONFLUENCE_URL else 'Not set')
+            log.debug("   👤 Username config: %s", 'Set' if USERNAME else 'Not set')
+            log.debug("   🔑 API Token: %s", 'Set' if API_TOKEN else 'Not set')
+            log.debug("   🏠 Personal space: %s", 'Set' if PERSONAL_SPACE_KEY else 'Not set')
 
             # Create connector instance
             connector = FormConfluenceDataToPersist()
-            print("✅ Connector initialization successful")
+            log.info("✅ Connector initialization successful")
 
             # Test fetching space list
-            print("\n📂 Testing space list retrieval...")
+            log.info("\n📂 Testing space list retrieval...")
             spaces = connector.fetch_spaces()
-            print(f"✅ Found {len(spaces)} spaces")
+            log.info("✅ Found %d spaces", len(spaces))
             for space in spaces[:3]:  # Only show first 3
-                print(f"   - {space.get('name')} ({space.get('key')})")
+                log.info("   - %s (%s)", space.get('name'), space.get('key'))
 
             # Test getting personal space info
             if connector.personal_space_key:
-                print(f"\n🏠 Testing personal space info retrieval: {connector.personal_space_key}")
+                log.info("\n🏠 Testing personal space info retrieval: %s", connector.personal_space_key)
                 try:
                     personal_space = connector.fetch_space_by_key(connector.personal_space_key)
-                    print(f"✅ Personal space: {personal_space.get('name')}")
+                    log.info("✅ Personal space: %s", personal_space.get('name'))
                 except Exception as e:
-                    print(f"⚠️ Failed to get personal space: {e}")
+                    log.warning("⚠️ Failed to get personal space: %s", e)
 
                 # Test getting personal space pages
-                print(f"\n📄 Testing personal space page retrieval...")
+                log.info("\n📄 Testing personal space page retrieval...")
                 try:
                     pages = connector.fetch_personal_space_pages(limit=5)
-                    print(f"✅ Found {len(pages)} pages")
+                    log.info("✅ Found %d pages", len(pages))
                     for page in pages:
-                        print(f"   - {page.get('title')}")
+                        log.info("   - %s", page.get('title'))
                 except Exception as e:
-                    print(f"⚠️ Failed to get pages: {e}")
+                    log.warning("⚠️ Failed to get pages: %s", e)
             else:
-                print("⚠️ Personal space key not configured, skipping personal space test")
+                log.warning("⚠️ Personal space key not configured, skipping personal space test")
 
             # Test processing and saving data (if there are pages)
             if connector.personal_space_key:
-                print(f"\n💾 Testing data save to JSON...")
+                log.info("\n💾 Testing data save to JSON...")
                 try:
                     result = connector.process_and_save_pages_to_json(
                         space_key=connector.personal_space_key,
                         output_file="data/jason/Software_dev_confluence_data.json"
                     )
-                    print(f"✅ {result}")
+                    log.info("✅ %s", result)
                 except Exception as e:
-                    print(f"⚠️ Failed to save data: {e}")
+                    log.warning("⚠️ Failed to save data: %s", e)
 
-            print("\n🎉 Test completed!")
+            log.info("\n🎉 Test completed!")
 
         except Exception as e:
-            print(f"❌ Test failed: {e}")
-            print("Please check environment variable configuration:")
-            print("- CONFLUENCE_URL")
-            print("- CONFLUENCE_USERNAME")
-            print("- CONFLUENCE_API_TOKEN")
-            print("- CCONFLUENCE_PERSONAL_SPACE_KEY")
+            log.error("❌ Test failed: %s", e)
+            log.error("Please check environment variable configuration:")
+            log.error("- CONFLUENCE_URL")
+            log.error("- CONFLUENCE_USERNAME")
+            log.error("- CONFLUENCE_API_TOKEN")
+            log.error("- CONFLUENCE_PERSONAL_SPACE_KEY")
 
     def test_environment_variables():
         """Check environment variable configuration"""
-        print("🔧 Checking environment variable configuration...")
+        log.info("🔧 Checking environment variable configuration...")
 
         required_vars = {
             'CONFLUENCE_URL': CONFLUENCE_URL,
             'CONFLUENCE_USERNAME': USERNAME,
             'CONFLUENCE_API_TOKEN': API_TOKEN,
-            'CCONFLUENCE_PERSONAL_SPACE_KEY': PERSONAL_SPACE_KEY
+            'CONFLUENCE_PERSONAL_SPACE_KEY': PERSONAL_SPACE_KEY
         }
 
         missing_vars = []
         for var_name, var_value in required_vars.items():
             if var_value:
-                print(f"✅ {var_name}: Configured")
+                log.info("✅ %s: Configured", var_name)
             else:
-                print(f"❌ {var_name}: Not configured")
+                log.error("❌ %s: Not configured", var_name)
                 missing_vars.append(var_name)
 
         if missing_vars:
-            print(f"\n⚠️ Missing environment variables: {', '.join(missing_vars)}")
-            print("Please configure these variables in .env file")
+            log.warning("\n⚠️ Missing environment variables: %s", ', '.join(missing_vars))
+            log.warning("Please configure these variables in .env file")
             return False
         else:
-            print("\n✅ All environment variables are configured")
+            log.info("\n✅ All environment variables are configured")
             return True
 
     # Run tests
-    print("=" * 50)
-    print("Confluence Connector Test")
-    print("=" * 50)
+    log.info("=" * 50)
+    log.info("Confluence Connector Test")
+    log.info("=" * 50)
 
     # First check environment variables
     if test_environment_variables():
-        print("\n" + "=" * 50)
+        log.info("\n" + "=" * 50)
         # Then run functionality tests
         test_confluence_connector()
     else:
-        print("\n❌ Environment variable configuration incomplete, skipping functionality tests")
\ No newline at end of file
+        log.error("\n❌ Environment variable configuration incomplete, skipping functionality tests")
@@ -5,19 +5,18 @@ Test accessing specific Confluence space
 
 import sys
 import os
-from dotenv import load_dotenv
 sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
 
 from backend.connectors.confluence import ConfluenceConnector
-import json
-
-load_dotenv()
+from backend.core.config.settings import get_confluence_env
+import orjson
 
 # Load environment variables
-CONFLUENCE_URL = os.getenv('CONFLUENCE_URL')
-USERNAME = os.getenv('CONFLUENCE_USERNAME')
-API_TOKEN = os.getenv('CONFLUENCE_API_TOKEN')
-PERSONAL_SPACE_KEY = os.getenv('CCONFLUENCE_PERSONAL_SPACE_KEY')
+ENV = get_confluence_env()
+CONFLUENCE_URL = ENV.url
+USERNAME = ENV.username
+API_TOKEN = ENV.api_token
+PERSONAL_SPACE_KEY = ENV.personal_space_key
 
 def main():
     try:
@@ -63,15 +62,16 @@ def main():
             print("="*50)
 
             # Save to file
-            with open('personal_space_data.json', 'w', encoding='utf-8') as f:
-                json.dump(processed, f, indent=2, ensure_ascii=False)
+            with open('personal_space_data.json', 'wb') as f:
+                f.write(orjson.dumps(processed, option=orjson.OPT_INDENT_2))
             print("Data saved to personal_space_data.json")
         else:
             print("No pages found in personal space")
 
             # Try alternative approach - get all spaces and find yours
             print("\nTrying to find your space in all available spaces...")
-            all_spaces = connector.fetch_spaces()
+            # Re-runs of this diagnostic reuse the listing for 5 minutes
+            all_spaces = connector.fetch_spaces(ttl=300)
             print(f"Found {len(all_spaces)} total spaces")
 
             for space in all_spaces:
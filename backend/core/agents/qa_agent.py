@@ -1,68 +1,198 @@
 # agents/qa_agent.py
+from dataclasses import dataclass
 from datetime import datetime
+from functools import lru_cache
 from typing import Dict, List
 from langchain_ollama import OllamaLLM
-from langchain.prompts import PromptTemplate
-from langchain.chains import RetrievalQA
 from langchain_chroma import Chroma
+from langchain_core.documents import Document
+import asyncio
 import chromadb
+import httpx
+import os
+import re
 # backend/core/rag/vector_store.py
 # from backend.core.rag import VectorStore
-from langchain_ollama import OllamaEmbeddings
-from backend.core.rag.benchmark_system import ConfluenceBenchmark, TestCase
+from backend.core.rag.embeddings import shared_query_embeddings
+from backend.core.rag.query_batcher import QueryBatcher
+from backend.core.rag.vector_store import HNSW_PARAMS, open_collection
 
+COLLECTION_NAME = "team_knowledge"
+# Number of chunks retrieved as context for each question
+RETRIEVAL_K = 2
+# 4-bit quantized weights: answers are at most 5 words, so int4 quality loss is
+# negligible while each generated token moves far fewer bytes than fp16
+DEFAULT_OLLAMA_MODEL = "qwen3:4b-q4_K_M"
+
+@dataclass(slots=True, frozen=True)
+class GenerationConfig:
+    """Ollama sampling settings, so agent variants are configurations rather than copies of QAAgent"""
+    temperature: float = 0.1
+    top_p: float = 0.3
+    # Answers are 5 words or less, but in /no_think mode qwen3 still emits an empty
+    # <think>\n\n</think> block first, and those tokens count against num_predict
+    num_predict: int = 30
+
+# Short, near-deterministic factual answers (the prompt asks for 5 words or less)
+STRICT_GENERATION = GenerationConfig()
+
+# Plain str.format template: formatted directly, without LangChain prompt validation per call
+# /no_think switches qwen3 to non-thinking mode, so no tokens go to a reasoning trace
+PROMPT_TEMPLATE = """/no_think
+Answer the question using ONLY the given context.
+        Give a direct, factual answer in 5 words or less.
+        If not in context, answer: "Information not available"
+
+        Context: {context}
+        Question: {question}
+        Answer:"""
+
+# qwen3 may still emit an (empty) <think>...</think> block before the answer
+_THINK_RE = re.compile(r'<think>.*?</think>\s*', re.S)
+
+def _strip_thinking(answer: str) -> str:
+    """Remove qwen3's reasoning block, complete or cut off by num_predict"""
+    return _THINK_RE.sub('', answer).split('<think>', 1)[0].strip()
 
 
 class QAAgent:
-    def __init__(self, chroma_db_path="data/chroma_db", ollama_model="qwen3:4b", ollama_base_url="http://localhost:11434"):
-        self.vector_store = self._init_chroma_db(chroma_db_path)
-        self.llm = self._init_ollama_llm(ollama_model, ollama_base_url)
-        self.qa_chain = self._init_qa_chain()
+    def __init__(self, chroma_db_path="data/chroma_db", ollama_model=DEFAULT_OLLAMA_MODEL, ollama_base_url="http://localhost:11434",
+                 chroma_host=None, chroma_port=8000, num_gpu=None, hnsw_params=None,
+                 generation: GenerationConfig = STRICT_GENERATION):
+        # Query embeddings are cached process-wide, so repeated questions skip the embedding model
+        self.embeddings = shared_query_embeddings()
+        # hnsw_params (e.g. {"hnsw:M": 16, "hnsw:search_ef": 40}) override HNSW_PARAMS, but
+        # only when this agent creates the collection: Chroma fixes HNSW settings at creation,
+        # so an existing collection keeps the settings it was ingested with
+        self.vector_store = self._init_chroma_db(chroma_db_path, chroma_host, chroma_port, hnsw_params)
+        # Concurrent ask() calls share ChromaDB queries through the batcher
+        self.batcher = QueryBatcher(self.collection)
+        self.llm = self._init_ollama_llm(ollama_model, ollama_base_url, num_gpu, generation)
 
-    def _init_chroma_db(self, db_path):
-        client = chromadb.PersistentClient(path=db_path)
+    def _init_chroma_db(self, db_path, host=None, port=8000, hnsw_params=None):
+        if host:
+            # Server mode: the collection lives in a separate ChromaDB process,
+            # so it is not loaded into every agent process (e.g. every web worker)
+            self.chroma_client = chromadb.HttpClient(host=host, port=port)
+        else:
+            # PersistentClient silently creates an empty database for a missing path,
+            # which would make every answer "Information not available"
+            if not os.path.isdir(db_path):
+                raise FileNotFoundError(
+                    f"ChromaDB directory not found: {db_path} "
+                    "(populate it with backend/core/rag/json_to_vector.py first)"
+                )
+            self.chroma_client = chromadb.PersistentClient(path=db_path)
+        # Opened before the LangChain wrapper (whose get_or_create would make a plain L2
+        # collection): a missing collection gets HNSW_PARAMS, an existing one is read as is
+        self.collection = open_collection(self.chroma_client, COLLECTION_NAME, {**HNSW_PARAMS, **(hnsw_params or {})})
         return Chroma(
-            client=client,
-            collection_name="team_knowledge"
+            client=self.chroma_client,
+            collection_name=COLLECTION_NAME,
+            embedding_function=self.embeddings
         )
 
-    def _init_ollama_llm(self, model, base_url):
+    def _init_ollama_llm(self, model, base_url, num_gpu=None, generation: GenerationConfig = STRICT_GENERATION):
         return OllamaLLM(
             model=model,
             base_url=base_url,
-            temperature=0.1,
-            top_p=0.3,
-            num_predict=30
+            # Number of layers offloaded to the GPU (e.g. 999 for all), None lets Ollama decide
+            num_gpu=num_gpu,
+            temperature=generation.temperature,
+            top_p=generation.top_p,
+            num_predict=generation.num_predict,
+            # Keep the model resident in Ollama's memory between questions (default is 5 minutes)
+            keep_alive="30m",
+            # The LLM keeps persistent HTTP clients to Ollama, size their keep-alive pools
+            # for concurrent chats so each question reuses an open connection
+            client_kwargs={
+                "limits": httpx.Limits(max_keepalive_connections=32, max_connections=64),
+                "timeout": 60.0
+            }
         )
-    
-    def _init_qa_chain(self):
-        prompt_template = """Answer the question using ONLY the given context.
-        Give a direct, factual answer in 5 words or less.
-        If not in context, answer: "Information not available"
 
-        Context: {context}
-        Question: {question}
-        Answer:"""
-        
-        PROMPT = PromptTemplate(
-            template=prompt_template, 
-            input_variables=["context", "question"]
-        )
-        
-        return RetrievalQA.from_chain_type(
-            llm=self.llm,
-            chain_type="stuff",
-            retriever=self.vector_store.as_retriever(search_kwargs={"k": 2}),
-            chain_type_kwargs={"prompt": PROMPT},
-            return_source_documents=True
-        )
+    def warmup(self):
+        """Load the models and index so the first question does not pay the load costs"""
+        # Embedding model and HNSW index (bypasses the query cache, nothing is stored)
+        self.batcher.query(self.embeddings.embed_documents(["warmup"])[0], 1)
+        # LLM into Ollama's memory
+        self.llm.invoke("warmup")
     
+    def _retrieve(self, question: str) -> List[Document]:
+        """Top RETRIEVAL_K chunks for a question, searched through the shared batcher"""
+        hits = self.batcher.query(self.embeddings.embed_query(question), RETRIEVAL_K)
+        return self._to_documents(hits["documents"], hits["metadatas"])
+
+    @staticmethod
+    def _to_documents(documents: List[str], metadatas: List[Dict]) -> List[Document]:
+        return [
+            Document(page_content=content, metadata=metadata or {})
+            for content, metadata in zip(documents, metadatas)
+        ]
+
+    @staticmethod
+    def _build_prompt(question: str, docs: List[Document]) -> str:
+        """Fill the prompt the way a "stuff" chain does: retrieved chunks joined by blank lines"""
+        return PROMPT_TEMPLATE.format(context="\n\n".join(doc.page_content for doc in docs), question=question)
+
+    # Retrieval and generation are called directly instead of through a RetrievalQA
+    # chain, which skips its callback/validation overhead on every question
     def ask(self, question: str) -> Dict:
         """Answer questions"""
-        result = self.qa_chain.invoke({"query": question})
+        docs = self._retrieve(question)
+        answer = self.llm.invoke(self._build_prompt(question, docs))
+        return self._format_result(question, answer, docs)
+
+    async def ask_async(self, question: str) -> Dict:
+        """Answer questions without blocking the event loop while Ollama generates"""
+        # Embedding and the vector search are blocking, run them in a worker thread
+        docs = await asyncio.to_thread(self._retrieve, question)
+        answer = await self.llm.ainvoke(self._build_prompt(question, docs))
+        return self._format_result(question, answer, docs)
+
+    async def ask_many(self, questions: List[str], concurrency: int = 8) -> List[Dict]:
+        """Answer questions concurrently, at most `concurrency` in flight, results in input order"""
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def ask_one(question: str) -> Dict:
+            async with semaphore:
+                return await self.ask_async(question)
+
+        return await asyncio.gather(*(ask_one(question) for question in questions))
+
+    def ask_batch(self, questions: List[str]) -> List[Dict]:
+        """
+        Answer many questions at once: one embedding pass and one ChromaDB query
+        for all of them, then one concurrent LLM batch, instead of N separate ask() calls
+        """
+        if not questions:
+            return []
 
+        query_embeddings = self.embeddings.embed_documents(questions)
+        hits = self.batcher.collection.query(
+            query_embeddings=query_embeddings,
+            n_results=RETRIEVAL_K,
+            include=["documents", "metadatas"]
+        )
+        source_documents = [
+            self._to_documents(documents, metadatas)
+            for documents, metadatas in zip(hits["documents"], hits["metadatas"])
+        ]
+
+        prompts = [
+            self._build_prompt(question, docs)
+            for question, docs in zip(questions, source_documents)
+        ]
+        answers = self.llm.batch(prompts)
+
+        return [
+            self._format_result(question, answer, docs)
+            for question, answer, docs in zip(questions, answers, source_documents)
+        ]
+
+    def _format_result(self, question: str, answer: str, source_documents: List[Document]) -> Dict:
+        """Build the answer payload from the generated answer and the retrieved documents"""
         # Extract retrieved context and evidence
-        source_documents = result.get("source_documents", [])
         retrieved_context = []
         evidence = []
 
@@ -85,31 +215,52 @@ class QAAgent:
 
         return {
             "question": question,
-            "answer": result["result"],
+            "answer": _strip_thinking(answer),
             "retrieved_context": retrieved_context,
             "evidence": evidence,
             "timestamp": datetime.now().isoformat()
         }
-    
 
-# agent = QAAgent(chroma_db_path="data/chroma_db", ollama_model="llama2:latest")
-# benchmark = ConfluenceBenchmark()
-# cases = benchmark.test_cases
-# # for test in cases[:1]:
-# for test in cases:
 
-#     if test.difficulty=="EASY":
-#         print(f"\nQuestion: {test.query}")
-#         result = agent.ask(test.query)
-#         print(f"\nExpected Answer: {test.expected_answer}")
-#         print(f"Actual Answer: {result['answer']}")
+@lru_cache(maxsize=1)
+def get_agent(chroma_db_path="data/chroma_db", ollama_model=DEFAULT_OLLAMA_MODEL, chroma_host=None, chroma_port=8000,
+              num_gpu=None, generation: GenerationConfig = STRICT_GENERATION) -> QAAgent:
+    """
+    Process-wide QAAgent, built on first use and then reused, so the ChromaDB
+    index and the Ollama connections stay warm across questions
+    """
+    return QAAgent(
+        chroma_db_path=chroma_db_path,
+        ollama_model=ollama_model,
+        chroma_host=chroma_host,
+        chroma_port=chroma_port,
+        num_gpu=num_gpu,
+        generation=generation
+    )
+
+
+# Demo: run the EASY benchmark questions, only when executed directly
+# (python -m backend.core.agents.qa_agent) so importing QAAgent stays cheap
+if __name__ == "__main__":
+    from backend.core.rag.benchmark_system import ConfluenceBenchmark
+
+    agent = get_agent()
+    benchmark = ConfluenceBenchmark()
+    cases = benchmark.test_cases
+    # for test in cases[:1]:
+    for test in cases:
 
-        # # This part for debug  Context/RAG Contedxt
-        # print(f"\nRetrieved Context ({len(result['retrieved_context'])} chunks):")
-        # for i, context in enumerate(result['retrieved_context']):
-        #     print(f"  Chunk {i+1}: {context['content'][:400]}...")
+        if test.difficulty=="EASY":
+            print(f"\nQuestion: {test.query}")
+            result = agent.ask(test.query)
+            print(f"\nExpected Answer: {test.expected_answer}")
+            print(f"Actual Answer: {result['answer']}")
 
-        # print(f"\nEvidence Sources:")
-        # for evidence in result['evidence']:
-        #     print(f"  Source: {evidence['source']}, Page: {evidence['page']}, Size: {evidence['chunk_size']} chars")
+            # # This part for debug  Context/RAG Contedxt
+            # print(f"\nRetrieved Context ({len(result['retrieved_context'])} chunks):")
+            # for i, context in enumerate(result['retrieved_context']):
+            #     print(f"  Chunk {i+1}: {context['content'][:400]}...")
 
+            # print(f"\nEvidence Sources:")
+            # for evidence in result['evidence']:
+            #     print(f"  Source: {evidence['source']}, Page: {evidence['page']}, Size: {evidence['chunk_size']} chars")
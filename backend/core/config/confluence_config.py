@@ -3,11 +3,23 @@ Confluence Configuration Manager
 Handles multiple customer configurations dynamically
 """
 import os
+from contextlib import contextmanager
+from functools import lru_cache
 from typing import Dict, Optional
-from dataclasses import dataclass
-import json
+from dataclasses import dataclass, asdict
+from requests.auth import HTTPBasicAuth
+import orjson
+import threading
 
-@dataclass
+try:
+    # POSIX advisory file locks, shared by every worker process
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from backend.connectors.confluence import CONNECTION_PROBE_PATH, confluence_api_url, create_http_session
+
+@dataclass(slots=True, frozen=True)
 class ConfluenceConfig:
     """Configuration for a single Confluence instance"""
     url: str
@@ -16,28 +28,157 @@ class ConfluenceConfig:
     space_key: Optional[str] = None
     customer_id: Optional[str] = None
 
+@lru_cache(maxsize=64)
+def _probe_url(base_url: str) -> str:
+    """
+    Connection-test endpoint for a Confluence base URL, built once per URL.
+    Same URL rule as AsyncConfluenceConnector, so /test-connection and
+    onboarding accept and reject the same sites
+    """
+    return f"{confluence_api_url(base_url)}/{CONNECTION_PROBE_PATH}"
+
+@lru_cache(maxsize=4)
+def _load_raw(path: str, mtime_ns: int) -> Dict:
+    """
+    Parsed snapshot file, cached per modification time so managers created
+    for an unchanged file skip both the read and the JSON decoding
+    """
+    with open(path, 'rb') as f:
+        return orjson.loads(f.read())
+
 class ConfluenceConfigManager:
-    """Manage multiple customer Confluence configurations"""
+    """
+    Manage multiple customer Confluence configurations
+
+    Changes are appended to a journal (customer_configs.jsonl next to the config
+    file) instead of rewriting the whole file on every mutation. The journal is
+    folded into a full snapshot every `snapshot_every` mutations.
+
+    Replay, appends and compaction hold an flock on customer_configs.lock, so
+    several worker processes can share the files: one worker never removes a
+    journal line another appended after it last read the journal. Without fcntl
+    (Windows) only threads of a single process are serialized.
+    """
 
-    def __init__(self, config_file: str = "data/customer_configs.json"):
+    def __init__(self, config_file: str = "data/customer_configs.json", snapshot_every: int = 50):
         self.config_file = config_file
+        self.journal_file = os.path.splitext(config_file)[0] + ".jsonl"
+        self.lock_file = os.path.splitext(config_file)[0] + ".lock"
+        self.snapshot_every = snapshot_every
         self.configs: Dict[str, ConfluenceConfig] = {}
-        self.load_configs()
+        self._journal_entries = 0
+        self._loaded_stamp = None
+        self._lock = threading.RLock()
+        self._lock_depth = 0
+        # Pooled keep-alive session for connection tests; credentials are passed per request
+        self._session = create_http_session()
+        with self._locked(exclusive=False):
+            self.load_configs()
+
+    @contextmanager
+    def _locked(self, exclusive: bool = True):
+        """Hold the thread lock and the cross-process file lock (reentrant within a thread)"""
+        with self._lock:
+            if self._lock_depth or fcntl is None:
+                self._lock_depth += 1
+                try:
+                    yield
+                finally:
+                    self._lock_depth -= 1
+                return
+            os.makedirs(os.path.dirname(self.config_file) or '.', exist_ok=True)
+            with open(self.lock_file, 'a') as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+                self._lock_depth += 1
+                try:
+                    yield
+                finally:
+                    self._lock_depth -= 1
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _files_stamp(self) -> tuple:
+        """Modification times of the snapshot and journal files (None if missing)"""
+        return tuple(
+            os.stat(path).st_mtime_ns if os.path.exists(path) else None
+            for path in (self.config_file, self.journal_file)
+        )
+
+    def refresh(self):
+        """Reload configurations only if another process changed the files since we last read or wrote them"""
+        if self._files_stamp() == self._loaded_stamp:
+            return
+        with self._locked(exclusive=False):
+            # Re-check under the lock: the files may be mid-compaction by another process
+            if self._files_stamp() != self._loaded_stamp:
+                self.configs = {}
+                self._journal_entries = 0
+                self.load_configs()
+
+    def state_tag(self) -> str:
+        """Opaque tag that changes whenever the stored configurations change (usable as an ETag)"""
+        self.refresh()
+        return "-".join(str(mtime) for mtime in self._loaded_stamp)
+
+    def compact(self):
+        """Fold any journaled changes into the snapshot file, e.g. on graceful shutdown"""
+        with self._locked():
+            self.refresh()
+            if self._journal_entries:
+                self.save_configs()
 
     def load_configs(self):
-        """Load customer configurations from file"""
+        """
+        Load customer configurations from the snapshot file, then replay the journal.
+        Call with the file lock held (see _locked)
+        """
         if os.path.exists(self.config_file):
             try:
-                with open(self.config_file, 'r') as f:
-                    data = json.load(f)
-                    for customer_id, config_data in data.items():
-                        self.configs[customer_id] = ConfluenceConfig(**config_data)
+                data = _load_raw(self.config_file, os.stat(self.config_file).st_mtime_ns)
+                for customer_id, config_data in data.items():
+                    self.configs[customer_id] = ConfluenceConfig(**config_data)
             except Exception as e:
                 print(f"Error loading configs: {e}")
 
+        if os.path.exists(self.journal_file):
+            try:
+                with open(self.journal_file, 'rb') as f:
+                    for line in f:
+                        if line.strip():
+                            self._apply_journal_entry(orjson.loads(line))
+                            self._journal_entries += 1
+            except Exception as e:
+                print(f"Error replaying config journal: {e}")
+
+        self._loaded_stamp = self._files_stamp()
+
+    def _apply_journal_entry(self, entry: Dict):
+        """Apply a single journaled mutation to the in-memory configs"""
+        if entry['op'] == 'put':
+            self.configs[entry['customer_id']] = ConfluenceConfig(**entry['config'])
+        elif entry['op'] == 'delete':
+            self.configs.pop(entry['customer_id'], None)
+
+    def _append_journal(self, entry: Dict):
+        """Append a mutation to the journal with a single O_APPEND write, with the file lock held"""
+        os.makedirs(os.path.dirname(self.config_file) or '.', exist_ok=True)
+        fd = os.open(self.journal_file, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+        try:
+            os.write(fd, orjson.dumps(entry, option=orjson.OPT_APPEND_NEWLINE))
+        finally:
+            os.close(fd)
+
+        self._journal_entries += 1
+        self._loaded_stamp = self._files_stamp()
+        if self._journal_entries >= self.snapshot_every:
+            self.save_configs()
+
     def save_configs(self):
-        """Save customer configurations to file"""
-        os.makedirs(os.path.dirname(self.config_file), exist_ok=True)
+        """Save a full snapshot of customer configurations and clear the journal"""
+        with self._locked():
+            self._write_snapshot()
+
+    def _write_snapshot(self):
+        os.makedirs(os.path.dirname(self.config_file) or '.', exist_ok=True)
         data = {}
         for customer_id, config in self.configs.items():
             data[customer_id] = {
@@ -48,8 +189,17 @@ class ConfluenceConfigManager:
                 'customer_id': config.customer_id
             }
 
-        with open(self.config_file, 'w') as f:
-            json.dump(data, f, indent=2)
+        # Write to a temp file first so a crash never leaves a half-written snapshot
+        tmp_file = self.config_file + ".tmp"
+        with open(tmp_file, 'wb') as f:
+            f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+        os.replace(tmp_file, self.config_file)
+
+        # Everything in the journal is part of the snapshot now
+        if os.path.exists(self.journal_file):
+            os.remove(self.journal_file)
+        self._journal_entries = 0
+        self._loaded_stamp = self._files_stamp()
 
     def add_customer(self, customer_id: str, url: str, username: str,
                     api_token: str, space_key: Optional[str] = None) -> bool:
@@ -57,34 +207,44 @@ class ConfluenceConfigManager:
         try:
             # Validate the configuration by testing connection
             if self.test_confluence_connection(url, username, api_token):
-                self.configs[customer_id] = ConfluenceConfig(
+                config = ConfluenceConfig(
                     url=url,
                     username=username,
                     api_token=api_token,
                     space_key=space_key,
                     customer_id=customer_id
                 )
-                self.save_configs()
+                with self._locked():
+                    self.refresh()
+                    self.configs[customer_id] = config
+                    self._append_journal({'op': 'put', 'customer_id': customer_id, 'config': asdict(config)})
                 return True
             return False
         except Exception as e:
             print(f"Error adding customer: {e}")
             return False
 
+    def delete_customer(self, customer_id: str) -> bool:
+        """Remove a customer configuration, returns False if it does not exist"""
+        with self._locked():
+            self.refresh()
+            if customer_id not in self.configs:
+                return False
+            del self.configs[customer_id]
+            self._append_journal({'op': 'delete', 'customer_id': customer_id})
+            return True
+
     def get_customer_config(self, customer_id: str) -> Optional[ConfluenceConfig]:
         """Get configuration for a specific customer"""
+        self.refresh()
         return self.configs.get(customer_id)
 
     def test_confluence_connection(self, url: str, username: str, api_token: str) -> bool:
         """Test if Confluence credentials are valid"""
-        import requests
-        from requests.auth import HTTPBasicAuth
-
         try:
             # Test API call to get user info
-            test_url = f"{url.rstrip('/')}/rest/api/user/current"
-            response = requests.get(
-                test_url,
+            response = self._session.get(
+                _probe_url(url),
                 auth=HTTPBasicAuth(username, api_token),
                 timeout=10
             )
@@ -95,11 +255,13 @@ class ConfluenceConfigManager:
 
     def list_customers(self) -> list:
         """List all configured customers"""
+        self.refresh()
         return list(self.configs.keys())
 
 # Example usage for customer onboarding
 def onboard_customer(customer_id: str, confluence_url: str,
-                    username: str, api_token: str, space_key: str = None):
+                    username: str, api_token: str, space_key: str = None,
+                    config_manager: Optional[ConfluenceConfigManager] = None):
     """
     Onboard a new customer with their Confluence credentials
 
@@ -109,11 +271,12 @@ def onboard_customer(customer_id: str, confluence_url: str,
         username: Customer's email/username
         api_token: Customer's API token
         space_key: Optional specific space to focus on
+        config_manager: Manager to store the configuration in (a new one is created if not given)
 
     Returns:
         bool: True if successful, False otherwise
     """
-    config_manager = ConfluenceConfigManager()
+    config_manager = config_manager or ConfluenceConfigManager()
 
     print(f"🔄 Onboarding customer: {customer_id}")
     print(f"🌐 Confluence URL: {confluence_url}")
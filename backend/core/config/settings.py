@@ -0,0 +1,31 @@
+"""
+Environment Settings
+Reads the Confluence environment (and the project .env file) once per process
+"""
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+from pydantic import AliasChoices, Field
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+# Project root directory, where the .env file lives
+PROJECT_ROOT = Path(__file__).parent.parent.parent.parent
+ENV_FILE = PROJECT_ROOT / '.env'
+
+class ConfluenceEnv(BaseSettings):
+    """Confluence credentials from CONFLUENCE_* environment variables or the .env file"""
+    model_config = SettingsConfigDict(env_file=ENV_FILE, env_prefix='CONFLUENCE_', extra='ignore')
+
+    # Optional so callers can report exactly which variable is missing
+    url: Optional[str] = None
+    username: Optional[str] = None
+    api_token: Optional[str] = None
+    personal_space_key: Optional[str] = Field(
+        default=None,
+        validation_alias=AliasChoices('CONFLUENCE_Software_development_KEY', 'CONFLUENCE_PERSONAL_SPACE_KEY')
+    )
+
+@lru_cache(maxsize=1)
+def get_confluence_env() -> ConfluenceEnv:
+    """Process-wide settings snapshot, the environment and .env are parsed only once"""
+    return ConfluenceEnv()
@@ -1,19 +1,145 @@
 from langchain.embeddings import OpenAIEmbeddings
+from langchain_core.embeddings import Embeddings
+from chromadb.api.types import Documents, EmbeddingFunction, Embeddings as ChromaEmbeddings
+from chromadb.utils import embedding_functions
+from collections import OrderedDict
+from functools import lru_cache
 from typing import List, Optional
-import hashlib
+import numpy as np
+import threading
+
+def _normalize(embeddings: np.ndarray) -> np.ndarray:
+    """Scale vectors (the last axis) to unit length in place, zero vectors are left as is"""
+    norms = np.linalg.norm(embeddings, axis=-1, keepdims=True)
+    np.divide(embeddings, norms, out=embeddings, where=norms > 0)
+    return embeddings
 
 class EmbeddingManager:
-    def __init__(self, model: str = "text-embedding-ada-002"):
+    """
+    OpenAI embeddings with an in-memory LRU cache. Returned vectors are unit-normalized,
+    so cosine similarity is a plain dot product (a @ b.T for whole matrices).
+    """
+
+    def __init__(self, model: str = "text-embedding-ada-002", maxsize: int = 10000):
         self.embeddings = OpenAIEmbeddings(model=model)
-        self._cache = {}  # Simple memory cache
+        # LRU memory cache, bounded so a long-running process does not grow without limit.
+        # Embeddings are kept as contiguous float32 arrays (~6 KB for 1536 dims instead of
+        # ~50 KB as a list of Python floats), normalized once before they are cached
+        self._cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._maxsize = maxsize
+
+    def _cache_get(self, text: str) -> Optional[np.ndarray]:
+        embedding = self._cache.get(text)
+        if embedding is not None:
+            self._cache.move_to_end(text)
+        return embedding
+
+    def _cache_put(self, text: str, embedding: np.ndarray):
+        self._cache[text] = embedding
+        if len(self._cache) > self._maxsize:
+            self._cache.popitem(last=False)
     
-    def get_embedding(self, text: str, use_cache: bool = True) -> List[float]:
+    def get_embedding(self, text: str, use_cache: bool = True) -> np.ndarray:
+        """Unit-normalized float32 embedding of a text (call .tolist() where a plain list is needed)"""
+        # The text itself is the cache key: dict lookups already hash it, a digest would only add work
         if use_cache:
-            text_hash = hashlib.md5(text.encode()).hexdigest()
-            if text_hash in self._cache:
-                return self._cache[text_hash]
+            embedding = self._cache_get(text)
+            if embedding is not None:
+                return embedding
         
-        embedding = self.embeddings.embed_query(text)
+        embedding = _normalize(np.asarray(self.embeddings.embed_query(text), dtype=np.float32))
         if use_cache:
-            self._cache[text_hash] = embedding
-        return embedding
\ No newline at end of file
+            self._cache_put(text, embedding)
+        return embedding
+
+    def get_embeddings(self, texts: List[str], use_cache: bool = True) -> np.ndarray:
+        """
+        Embed many texts into a (len(texts), dim) matrix of unit-normalized float32 rows, in input order. Texts
+        missing from the cache are sent in one batched embed_documents call instead of
+        one round-trip per text.
+        """
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        if not use_cache:
+            return _normalize(np.asarray(self.embeddings.embed_documents(list(texts)), dtype=np.float32))
+
+        # dict.fromkeys deduplicates while keeping order
+        found = {text: self._cache_get(text) for text in dict.fromkeys(texts)}
+        missing = [text for text, embedding in found.items() if embedding is None]
+        if missing:
+            new_embeddings = _normalize(np.asarray(self.embeddings.embed_documents(missing), dtype=np.float32))
+            for text, embedding in zip(missing, new_embeddings):
+                found[text] = embedding
+                self._cache_put(text, embedding)
+        # Read from the local map: a large batch may already have evicted its first entries
+        return np.stack([found[text] for text in texts])
+
+class MicroBatchedEmbeddingFunction(EmbeddingFunction):
+    """
+    Chroma embedding function that feeds the wrapped model at most batch_size texts per
+    forward pass, so a large collection.add never becomes one oversized batch that runs
+    out of (GPU) memory
+    """
+
+    def __init__(self, inner: EmbeddingFunction, batch_size: int = 64):
+        self._inner = inner
+        self._batch_size = batch_size
+
+    # Chroma requires the parameter to be named input
+    def __call__(self, input: Documents) -> ChromaEmbeddings:
+        if len(input) <= self._batch_size:
+            return self._inner(input)
+        embeddings: ChromaEmbeddings = []
+        for start in range(0, len(input), self._batch_size):
+            embeddings.extend(self._inner(input[start:start + self._batch_size]))
+        return embeddings
+
+class CachedQueryEmbeddings(Embeddings):
+    """
+    LangChain wrapper around Chroma's default embedding model (the one VectorStore
+    ingests documents with), keeping an LRU cache of query embeddings so repeated
+    questions skip the model forward pass. Queries are keyed case- and
+    whitespace-insensitively, so "What is web3?" and "what is  web3? " share an entry.
+    """
+
+    def __init__(self, maxsize: int = 4096):
+        self._embedding_function = MicroBatchedEmbeddingFunction(embedding_functions.DefaultEmbeddingFunction())
+        self._cache: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._maxsize = maxsize
+        self._lock = threading.Lock()  # ask() runs on several threads at once
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def embedding_function(self) -> EmbeddingFunction:
+        """The underlying Chroma embedding function, to hand to a collection for ingestion"""
+        return self._embedding_function
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [list(embedding) for embedding in self._embedding_function(list(texts))]
+
+    def embed_query(self, text: str) -> List[float]:
+        key = " ".join(text.split()).lower()
+        with self._lock:
+            embedding = self._cache.get(key)
+            if embedding is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return embedding
+
+        embedding = self.embed_documents([text])[0]
+        with self._lock:
+            self.misses += 1
+            self._cache[key] = embedding
+            if len(self._cache) > self._maxsize:
+                self._cache.popitem(last=False)
+        return embedding
+
+@lru_cache(maxsize=1)
+def shared_query_embeddings() -> CachedQueryEmbeddings:
+    """
+    Process-wide query embedding cache, so every retrieval path (QAAgent, VectorStore.search)
+    embeds a repeated question once, e.g. when a benchmark replays the same test cases
+    against several systems
+    """
+    return CachedQueryEmbeddings(maxsize=4096)
@@ -6,10 +6,18 @@ Converts Confluence JSON data to vector embeddings and stores in ChromaDB
 
 import sys
 import os
-import json
+import hashlib
 import logging
+from itertools import islice
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Iterator
+
+import orjson
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
 
 # Add project root to Python path
 current_dir = Path(__file__).parent
@@ -46,37 +54,61 @@ class JSONToVectorConverter:
             logger.error(f"Failed to initialize vector store: {e}")
             raise
 
-    def load_json_file(self, json_file_path: str) -> List[Dict[str, Any]]:
+    def iter_json_documents(self, json_file_path: str) -> Iterator[Dict[str, Any]]:
         """
-        Load and validate JSON file
+        Stream documents from a JSON file without materializing the whole dump: JSON
+        arrays are parsed incrementally with ijson when it is installed, .jsonl/.ndjson
+        files line by line
 
         Args:
-            json_file_path: Path to the JSON file
+            json_file_path: Path to the JSON file (a list of documents, or one document per line for .jsonl/.ndjson)
 
-        Returns:
-            List of document dictionaries
+        Yields:
+            Document dictionaries
         """
         try:
             logger.info(f"Loading JSON file: {json_file_path}")
-            with open(json_file_path, 'r', encoding='utf-8') as f:
-                documents = json.load(f)
-
-            if not isinstance(documents, list):
-                raise ValueError("JSON file must contain a list of documents")
-
-            logger.info(f"Loaded {len(documents)} documents from JSON file")
-            return documents
+            if json_file_path.endswith(('.jsonl', '.ndjson')):
+                # Newline-delimited JSON, one document per line
+                with open(json_file_path, 'rb') as f:
+                    for line in f:
+                        if line.strip():
+                            yield orjson.loads(line)
+            elif ijson is not None:
+                # use_float keeps numbers as float instead of Decimal, which Chroma metadata rejects
+                with open(json_file_path, 'rb') as f:
+                    yield from ijson.items(f, 'item', use_float=True)
+            else:
+                with open(json_file_path, 'rb') as f:
+                    documents = orjson.loads(f.read())
+                if not isinstance(documents, list):
+                    raise ValueError("JSON file must contain a list of documents")
+                yield from documents
 
         except FileNotFoundError:
             logger.error(f"JSON file not found: {json_file_path}")
             raise
-        except json.JSONDecodeError as e:
+        except orjson.JSONDecodeError as e:
             logger.error(f"Invalid JSON format: {e}")
             raise
         except Exception as e:
             logger.error(f"Error loading JSON file: {e}")
             raise
 
+    def load_json_file(self, json_file_path: str) -> List[Dict[str, Any]]:
+        """
+        Load and validate JSON file
+
+        Args:
+            json_file_path: Path to the JSON file (a list of documents, or one document per line for .jsonl/.ndjson)
+
+        Returns:
+            List of document dictionaries
+        """
+        documents = list(self.iter_json_documents(json_file_path))
+        logger.info(f"Loaded {len(documents)} documents from JSON file")
+        return documents
+
     def validate_document_format(self, documents: List[Dict[str, Any]]) -> bool:
         """
         Validate that documents have required fields
@@ -87,31 +119,95 @@ class JSONToVectorConverter:
         Returns:
             True if all documents are valid
         """
-        required_fields = ['id', 'content']
+        try:
+            for _ in self._iter_validated(documents):
+                pass
+        except ValueError:
+            return False
+        return True
 
-        for i, doc in enumerate(documents):
-            if not isinstance(doc, dict):
-                logger.error(f"Document {i} is not a dictionary")
+    @staticmethod
+    def _validate_document(i: int, doc: Any) -> bool:
+        """Check a single document (the i-th in its file) for the required fields"""
+        if not isinstance(doc, dict):
+            logger.error(f"Document {i} is not a dictionary")
+            return False
+
+        for field in ('id', 'content'):
+            if field not in doc:
+                logger.error(f"Document {i} missing required field: {field}")
                 return False
+        return True
 
-            for field in required_fields:
-                if field not in doc:
-                    logger.error(f"Document {i} missing required field: {field}")
-                    return False
+    @staticmethod
+    def _log_validation_summary(total: int, empty: int):
+        # One summary line instead of a warning per empty document
+        if empty:
+            logger.warning(f"Validated {total} documents, {empty} have empty content")
+        else:
+            logger.info(f"All {total} documents passed validation")
 
+    def _iter_validated(self, documents: Iterable[Any]) -> Iterator[Dict[str, Any]]:
+        """Pass documents through while validating them, stopping at the first invalid one"""
+        log_debug = logger.debug if logger.isEnabledFor(logging.DEBUG) else None
+        total = empty = 0
+        for i, doc in enumerate(documents):
+            if not self._validate_document(i, doc):
+                raise ValueError("Document validation failed")
+            total += 1
             if not doc['content'].strip():
-                logger.warning(f"Document {i} has empty content")
+                empty += 1
+                if log_debug:
+                    log_debug(f"Document {i} has empty content")
+            yield doc
 
-        logger.info("All documents passed validation")
-        return True
+        self._log_validation_summary(total, empty)
 
-    def convert_and_store(self, json_file_path: str, clear_existing: bool = False) -> bool:
+    def deduplicate_documents(self, documents: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
         """
-        Convert JSON documents to vectors and store in database
+        Drop documents whose content repeats an earlier one, so each text is embedded and
+        indexed only once. Content is compared case- and whitespace-insensitively through
+        a 16-byte digest, so memory stays bounded per document rather than per text size.
+        Documents with empty or whitespace-only content are dropped (nothing to embed)
+
+        Args:
+            documents: Document dictionaries (any iterable, consumed lazily)
+
+        Yields:
+            Documents with unique, non-empty content, first occurrence kept
+        """
+        seen = set()
+        skipped = 0
+        empty = 0
+        for doc in documents:
+            key = " ".join(doc['content'].split()).lower()
+            if not key:
+                empty += 1
+                continue
+            digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+            if digest in seen:
+                skipped += 1
+                continue
+            seen.add(digest)
+            yield doc
+
+        if skipped:
+            logger.info(f"Skipped {skipped} documents with duplicate content")
+        if empty:
+            logger.info(f"Skipped {empty} documents with empty content")
+
+    def convert_and_store(self, json_file_path: str, clear_existing: bool = False, deduplicate: bool = True,
+                          batch_size: int = 1024) -> bool:
+        """
+        Convert JSON documents to vectors and store in database. Documents are streamed
+        from the file and stored batch_size at a time, so memory holds one batch, not the
+        whole file
 
         Args:
             json_file_path: Path to the JSON file
             clear_existing: Whether to clear existing documents first
+            deduplicate: Whether to skip documents with duplicate content
+            batch_size: Documents read into memory per add_documents call
 
         Returns:
             True if conversion was successful
@@ -120,34 +216,33 @@ class JSONToVectorConverter:
             # Initialize vector store
             self.initialize_vector_store()
 
-            # Load documents
-            documents = self.load_json_file(json_file_path)
-
-            # Validate document format
-            if not self.validate_document_format(documents):
-                logger.error("Document validation failed")
-                return False
-
             # Clear existing documents if requested
             if clear_existing:
                 logger.info("Clearing existing documents...")
                 try:
-                    # Get current document IDs and delete them
-                    collection_info = self.vector_store.get_collection_info()
-                    if collection_info['count'] > 0:
-                        # Note: ChromaDB doesn't have a clear all method, so we'd need to delete by IDs
-                        logger.warning("Clear existing not fully implemented - continuing with add")
+                    self.vector_store.clear()
                 except Exception as e:
                     logger.warning(f"Could not clear existing documents: {e}")
 
+            # Load documents, validating each one as it is read (fail fast on a bad record)
+            documents = self._iter_validated(self.iter_json_documents(json_file_path))
+            if deduplicate:
+                documents = self.deduplicate_documents(documents)
+
             # Add documents to vector store
-            logger.info(f"Adding {len(documents)} documents to vector database...")
-            self.vector_store.add_documents(documents)
+            logger.info("Adding documents to vector database...")
+            added = 0
+            while batch := list(islice(documents, batch_size)):
+                self.vector_store.add_documents(batch)
+                added += len(batch)
+
+            if not added:
+                logger.warning("No documents found in JSON file")
 
             # Verify storage
             collection_info = self.vector_store.get_collection_info()
             logger.info(f"✅ Conversion completed successfully!")
-            logger.info(f"Collection '{collection_info['name']}' now contains {collection_info['count']} documents")
+            logger.info(f"Added {added} documents, collection '{collection_info['name']}' now contains {collection_info['count']} documents")
 
             return True
 
@@ -0,0 +1,69 @@
+# core/rag/query_batcher.py
+from concurrent.futures import Future
+from typing import Any, Dict, List
+import logging
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+class QueryBatcher:
+    """
+    Micro-batches vector searches from concurrent callers.
+
+    Query embeddings submitted from different threads are collected for up to
+    `max_wait` seconds (or `max_batch_size` queries) and sent to ChromaDB in a
+    single collection.query call, amortizing the per-call overhead across all
+    in-flight requests. Each caller blocks only on its own result.
+    """
+
+    def __init__(self, collection, max_batch_size: int = 32, max_wait: float = 0.005):
+        self.collection = collection
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._queue: "queue.Queue" = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="chroma-query-batcher", daemon=True)
+        self._worker.start()
+
+    def query(self, embedding: List[float], n_results: int) -> Dict[str, List[Any]]:
+        """Search for one query embedding, returns its ids, documents, metadatas and distances"""
+        future: Future = Future()
+        self._queue.put((embedding, n_results, future))
+        return future.result()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            self._execute(batch)
+
+    def _execute(self, batch: List[tuple]):
+        # One call serves every query, so ask for the largest n_results and trim per caller
+        n_results = max(n for _, n, _ in batch)
+        try:
+            results = self.collection.query(
+                query_embeddings=[embedding for embedding, _, _ in batch],
+                n_results=n_results,
+                include=["documents", "metadatas", "distances"]
+            )
+        except Exception as e:
+            logger.error(f"Batched query of {len(batch)} embeddings failed: {e}")
+            for _, _, future in batch:
+                future.set_exception(e)
+            return
+
+        logger.debug(f"Served {len(batch)} queries with one collection.query call")
+        for i, (_, n, future) in enumerate(batch):
+            future.set_result({
+                key: results[key][i][:n]
+                for key in ("ids", "documents", "metadatas", "distances")
+            })
@@ -13,12 +13,12 @@ current_dir = Path(__file__).parent
 project_root = current_dir.parent.parent.parent
 sys.path.insert(0, str(project_root))
 
-from backend.core.rag.benchmark_system import ConfluenceBenchmark, BenchmarkReport
-from backend.core.agents.qa_agent import QAAgent
+from backend.core.rag.benchmark_system import DIFFICULTIES, ConfluenceBenchmark, BenchmarkReport
+from backend.core.agents.qa_agent import DEFAULT_OLLAMA_MODEL, QAAgent
 from backend.core.rag.vector_store import VectorStore
+import asyncio
 import logging
 import time
-import json
 from typing import Dict, List
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -33,6 +33,8 @@ class BaselineRAGSystem:
     def __init__(self, vector_db_path: str = "./data/chroma_db"):
         self.vector_store = VectorStore(persist_directory=vector_db_path)
         self.vector_store.create_or_get_collection("team_knowledge")
+        # Keep the embedding model load out of the first benchmarked query's time
+        self.vector_store.warmup()
 
     def ask(self, query: str) -> Dict:
         """Simple search - return top result"""
@@ -82,29 +84,18 @@ def run_comprehensive_benchmark():
     # Evaluate Advanced System
     if advanced_system:
         logger.info("\n🔥 Evaluating Advanced QA Agent...")
-        advanced_report = benchmark.evaluate_rag_system(advanced_system, "Advanced QA Agent")
+        # Detailed results are streamed to the file, one JSON line per evaluated case
+        results_file = f"./data/benchmark_results_advanced_{int(time.time())}.jsonl"
+        advanced_report = benchmark.evaluate_rag_system(advanced_system, "Advanced QA Agent", results_file=results_file)
         reports.append(("Advanced", advanced_report))
-
-        # Save detailed results
-        results_file = f"./data/benchmark_results_advanced_{int(time.time())}.json"
-        benchmark.save_detailed_results(
-            [result for result in benchmark.results if result],
-            results_file
-        )
         logger.info(f"📄 Detailed results saved to {results_file}")
 
     # Evaluate Baseline System
     if baseline_system:
         logger.info("\n⚖️ Evaluating Baseline System...")
-        baseline_report = benchmark.evaluate_rag_system(baseline_system, "Baseline Vector Search")
+        results_file = f"./data/benchmark_results_baseline_{int(time.time())}.jsonl"
+        baseline_report = benchmark.evaluate_rag_system(baseline_system, "Baseline Vector Search", results_file=results_file)
         reports.append(("Baseline", baseline_report))
-
-        # Save detailed results
-        results_file = f"./data/benchmark_results_baseline_{int(time.time())}.json"
-        benchmark.save_detailed_results(
-            [result for result in benchmark.results if result],
-            results_file
-        )
         logger.info(f"📄 Detailed results saved to {results_file}")
 
     # Print individual reports
@@ -122,6 +113,10 @@ def run_comprehensive_benchmark():
     logger.info("\n🎉 Benchmark completed!")
     return reports
 
+# Comparison table accuracy row: label, advanced and baseline accuracy, relative change in %.
+# One format call per row instead of building every padded cell with a nested f-string
+_ACCURACY_ROW = "{:<25} | {:<15.1%} | {:<15.1%} | {:+.1f}%".format
+
 def generate_comparison_report(reports: List[tuple]):
     """Generate side-by-side comparison report"""
 
@@ -138,20 +133,28 @@ def generate_comparison_report(reports: List[tuple]):
     adv_acc = advanced_report.overall_accuracy
     base_acc = baseline_report.overall_accuracy
     improvement = ((adv_acc - base_acc) / base_acc * 100) if base_acc > 0 else 0
-    print(f"{'Overall Accuracy':<25} | {f'{adv_acc:.1%}':<15} | {f'{base_acc:.1%}':<15} | {improvement:+.1f}%")
+    print(_ACCURACY_ROW("Overall Accuracy", adv_acc, base_acc, improvement))
 
     # By difficulty
-    for difficulty in ["EASY", "MEDIUM", "HARD"]:
+    for difficulty in DIFFICULTIES:
         adv_diff = advanced_report.accuracy_by_difficulty.get(difficulty, 0)
         base_diff = baseline_report.accuracy_by_difficulty.get(difficulty, 0)
         improvement = ((adv_diff - base_diff) / base_diff * 100) if base_diff > 0 else 0
-        print(f"{f'{difficulty} Queries':<25} | {f'{adv_diff:.1%}':<15} | {f'{base_diff:.1%}':<15} | {improvement:+.1f}%")
+        print(_ACCURACY_ROW(f"{difficulty} Queries", adv_diff, base_diff, improvement))
 
     # Response time
     adv_time = advanced_report.avg_response_time
     base_time = baseline_report.avg_response_time
     time_change = ((adv_time - base_time) / base_time * 100) if base_time > 0 else 0
-    print(f"{'Avg Response Time':<25} | {adv_time:.2f}s{'':<9} | {base_time:.2f}s{'':<9} | {time_change:+.0f}%")
+    # Latency under load when the cases ran concurrently (see evaluate_rag_system)
+    time_label = "Avg Response Time"
+    if advanced_report.concurrency > 1 or baseline_report.concurrency > 1:
+        time_label = f"Avg Latency ({max(advanced_report.concurrency, baseline_report.concurrency)} parallel)"
+    print(f"{time_label:<25} | {adv_time:.2f}s{'':<9} | {base_time:.2f}s{'':<9} | {time_change:+.0f}%")
+    adv_tput = advanced_report.throughput
+    base_tput = baseline_report.throughput
+    tput_change = ((adv_tput - base_tput) / base_tput * 100) if base_tput > 0 else 0
+    print(f"{'Throughput (queries/s)':<25} | {adv_tput:<15.2f} | {base_tput:<15.2f} | {tput_change:+.0f}%")
 
     # Critical misses
     adv_critical = len(advanced_report.critical_misses)
@@ -187,7 +190,7 @@ def quick_benchmark():
     benchmark.test_cases = benchmark.test_cases[:8]
 
     try:
-        qa_agent = QAAgent(chroma_db_path="./data/chroma_db", ollama_model="qwen3:4b")
+        qa_agent = QAAgent(chroma_db_path="./data/chroma_db", ollama_model=DEFAULT_OLLAMA_MODEL)
         report = benchmark.evaluate_rag_system(qa_agent, "QA Agent (Quick Test)")
         benchmark.print_report(report)
     except Exception as e:
@@ -198,25 +201,35 @@ def test_specific_query():
 
     logger.info("🎯 Interactive Query Testing")
 
+    # One event loop for the whole session: the LLM's async HTTP client keeps its
+    # connections to Ollama bound to the loop they were opened on
+    loop = asyncio.new_event_loop()
     try:
-        qa_agent = QAAgent(chroma_db_path="./data/chroma_db", ollama_model="qwen3:4b")
+        qa_agent = QAAgent(chroma_db_path="./data/chroma_db", ollama_model=DEFAULT_OLLAMA_MODEL)
 
         while True:
-            query = input("\nEnter your test query (or 'quit' to exit): ").strip()
+            query = input("\nEnter your test query, several separated by ';;' run concurrently (or 'quit' to exit): ").strip()
             if query.lower() in ['quit', 'exit', '']:
                 break
 
+            queries = [q.strip() for q in query.split(';;') if q.strip()]
             start_time = time.time()
-            result = qa_agent.ask(query)
+            if len(queries) == 1:
+                results = [qa_agent.ask(queries[0])]
+            else:
+                results = loop.run_until_complete(qa_agent.ask_many(queries))
             response_time = time.time() - start_time
 
-            print(f"\n📝 Query: {query}")
+            for query, result in zip(queries, results):
+                print(f"\n📝 Query: {query}")
+                print(f"🤖 Answer: {result.get('answer', 'No answer')}")
             print(f"⏱️ Response Time: {response_time:.2f}s")
-            print(f"🤖 Answer: {result.get('answer', 'No answer')}")
             print("-" * 50)
 
     except Exception as e:
         logger.error(f"Interactive testing failed: {e}")
+    finally:
+        loop.close()
 
 def main():
     """Main CLI interface"""
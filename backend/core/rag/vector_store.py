@@ -1,34 +1,230 @@
 # core/rag/vector_store.py
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from operator import itemgetter
 from typing import List, Optional, Dict, Any
 import chromadb
 from chromadb.config import Settings
+import numpy as np
+from backend.core.rag.embeddings import shared_query_embeddings
+import json
 import logging
+import os
+import re
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
+# HNSW index settings for the low-k (top 2) retrieval the QA agent does: a sparser
+# graph (M=8, Chroma's default is 16) needs fewer distance computations per hop,
+# search_ef=20 (default 10) keeps top-2 recall. Applied when a collection is created:
+# Chroma copies hnsw:* settings into the index segment at that point, and changing the
+# collection metadata later does not reach the index (re-ingest to change them)
+HNSW_PARAMS = {
+    "hnsw:space": "cosine",
+    "hnsw:M": 8,
+    "hnsw:construction_ef": 64,
+    "hnsw:search_ef": 20
+}
+
+def open_collection(client, name: str, metadata: Dict[str, Any], embedding_function=None):
+    """
+    Get a collection, creating it with metadata if it does not exist. Unlike
+    get_or_create_collection, an existing collection's metadata is never rewritten,
+    since its HNSW settings were fixed when it was created
+    """
+    kwargs = {} if embedding_function is None else {"embedding_function": embedding_function}
+    try:
+        return client.get_collection(name=name, **kwargs)
+    except ValueError:
+        pass  # Does not exist yet
+    try:
+        return client.create_collection(name=name, metadata=metadata, **kwargs)
+    except Exception:
+        # Another process created it since the lookup
+        return client.get_collection(name=name, **kwargs)
+
+# Literal queries answered by a direct lookup instead of a semantic search: a quoted
+# phrase (documents containing it) or a bare document id as stored by the Confluence importer
+_QUOTED_PHRASE_RE = re.compile(r'"([^"]+)"')
+_DOC_ID_RE = re.compile(r'confluence_\d+')
+
+# Ids per collection.get/delete call, keeps each SQLite statement's parameter list bounded
+_ID_LOOKUP_BATCH = 5000
+
+# Rows of an int8 in-memory index converted back to float32 at a time while scoring
+_DEQUANTIZE_BLOCK = 4096
+
+@dataclass(slots=True, frozen=True)
+class _InMemoryIndex:
+    """Snapshot of a collection for in-memory search, see VectorStore.build_inmem_index"""
+    embeddings: np.ndarray  # (n, dim) float32, or int8 rows times scales
+    scales: Optional[np.ndarray]
+    ids: List[str]
+    documents: List[str]
+    metadatas: List[Optional[Dict[str, Any]]]
+    # Metadata as columns: key -> object array of each document's value (None if missing)
+    columns: Dict[str, np.ndarray]
+
+def _where_mask(columns: Dict[str, np.ndarray], where: Dict[str, Any], n: int) -> Optional[np.ndarray]:
+    """
+    Boolean mask of the documents matching a Chroma where filter, evaluated on the
+    metadata columns. Supports $and/$or and $eq/$ne/$in/$nin (and plain equality);
+    returns None for anything else, the caller then lets Chroma filter
+    """
+    masks = []
+    for key, condition in where.items():
+        if key in ("$and", "$or"):
+            sub_masks = [_where_mask(columns, sub_where, n) for sub_where in condition]
+            if not sub_masks or any(mask is None for mask in sub_masks):
+                return None
+            combine = np.logical_and if key == "$and" else np.logical_or
+            masks.append(combine.reduce(sub_masks))
+            continue
+
+        column = columns.get(key)
+        if column is None:
+            column = np.full(n, None, dtype=object)
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        if len(condition) != 1:
+            return None
+        (op, value), = condition.items()
+        if op == "$eq":
+            masks.append(column == value)
+        elif op in ("$ne", "$nin"):
+            # Like Chroma, documents without the key never match a negated filter
+            values = [value] if op == "$ne" else value
+            present = column != None  # elementwise on the object array
+            masks.append(present & ~np.logical_or.reduce([column == v for v in values] or [np.zeros(n, bool)]))
+        elif op == "$in":
+            masks.append(np.logical_or.reduce([column == v for v in value] or [np.zeros(n, bool)]))
+        else:
+            return None
+
+    if not masks:
+        return np.ones(n, dtype=bool)
+    return np.logical_and.reduce(masks)
+
 class VectorStore:
-    def __init__(self, persist_directory: str = "./data/chroma_db"):
+    def __init__(self, persist_directory: str = "./data/chroma_db", search_cache_size: int = 4096,
+                 search_cache_ttl: float = 300.0, quantization: Optional[str] = None):
+        if quantization not in (None, "int8"):
+            raise ValueError(f"Unsupported quantization: {quantization} (use None or 'int8')")
         try:
             self.client = chromadb.PersistentClient(path=persist_directory)
             self.collection = None
+            # LRU + TTL cache of formatted search results, so repeated queries skip the
+            # query embedding and the index lookup. Cleared on every write; 0 disables it
+            self._search_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+            self._search_cache_size = search_cache_size
+            self._search_cache_ttl = search_cache_ttl
+            self._search_cache_lock = threading.Lock()
+            self.search_cache_hits = 0
+            self.search_cache_misses = 0
+            # Queries go through the process-wide query cache; its Chroma default embedder
+            # is also passed to the collection, so documents and queries share one model
+            self._query_embeddings = shared_query_embeddings()
+            self._embedding_function = self._query_embeddings.embedding_function
+            # Optional in-memory copy of the collection, see build_inmem_index
+            self._inmem_index = None
+            self._quantization = quantization
             logger.info(f"Vector store initialized with directory: {persist_directory}")
         except Exception as e:
             logger.error(f"Failed to initialize vector store: {e}")
             raise
 
-    def create_or_get_collection(self, name: str = "team_knowledge"):
+    def create_or_get_collection(self, name: str = "team_knowledge", hnsw_params: Optional[Dict[str, Any]] = None):
+        """
+        Open the collection, creating it with HNSW_PARAMS overridden by hnsw_params if it
+        does not exist. hnsw_params only take effect for a new collection and persist with
+        it; an existing collection keeps the settings it was created with
+        """
         try:
-            self.collection = self.client.get_or_create_collection(
-                name=name,
-                metadata={"hnsw:space": "cosine"}
+            self.collection = open_collection(
+                self.client,
+                name,
+                {**HNSW_PARAMS, **(hnsw_params or {})},
+                embedding_function=self._embedding_function
             )
+            self._invalidate_read_caches()
             logger.info(f"Collection '{name}' created/retrieved successfully")
             return self.collection
         except Exception as e:
             logger.error(f"Failed to create/get collection '{name}': {e}")
             raise
 
-    def add_documents(self, documents: List[dict]):
+    def warmup(self):
+        """
+        Load the embedding model and fault the collection's HNSW index into memory with a
+        throwaway query, so the first real search does not pay the cold start
+        """
+        if not self.collection:
+            raise ValueError("Collection not initialized. Call create_or_get_collection first.")
+
+        try:
+            self.collection.query(query_embeddings=self._query_embeddings.embed_documents([" "]), n_results=1)
+            logger.info("Vector store warmed up")
+        except Exception as e:
+            # An empty collection has nothing to fault in, the model is still loaded
+            logger.warning(f"Vector store warmup query failed: {e}")
+
+    def _write_in_batches(self, write, documents: List[dict], batch_size: int, action: str, parallel: bool):
+        """
+        Send documents to a collection write (add/update) in fixed-size batches, so the
+        embedding model runs medium-sized forward passes and peak memory is one batch.
+        With parallel, batches run on a thread pool: the embedding function releases the
+        GIL, so one batch is embedded while another is written to SQLite
+        """
+        # Split the documents into pre-sized column lists in a single pass
+        n = len(documents)
+        contents, metadatas, ids = [None] * n, [None] * n, [None] * n
+        get_content, get_id = itemgetter('content'), itemgetter('id')
+        for i, doc in enumerate(documents):
+            contents[i] = get_content(doc)
+            metadatas[i] = doc.get('metadata', {})
+            ids[i] = get_id(doc)
+
+        def write_batch(start: int):
+            end = start + batch_size
+            write(documents=contents[start:end], metadatas=metadatas[start:end], ids=ids[start:end])
+
+        starts = range(0, len(documents), batch_size)
+        if not parallel or len(starts) == 1:
+            for start in starts:
+                try:
+                    write_batch(start)
+                except Exception as e:
+                    self._log_batch_error(action, start, batch_size, len(documents), e)
+                    raise
+            return
+
+        with ThreadPoolExecutor(max_workers=max(1, (os.cpu_count() or 2) // 2)) as executor:
+            futures = {executor.submit(write_batch, start): start for start in starts}
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    self._log_batch_error(action, futures[future], batch_size, len(documents), e)
+                    for pending in futures:
+                        pending.cancel()
+                    raise
+
+    @staticmethod
+    def _log_batch_error(action: str, start: int, batch_size: int, total: int, error: Exception):
+        logger.error(f"Failed to {action} documents {start}-{min(start + batch_size, total) - 1}: {error}")
+
+    def existing_ids(self, ids: List[str]) -> set:
+        """Which of the given ids are already stored, looked up without loading any embeddings"""
+        existing = set()
+        for start in range(0, len(ids), _ID_LOOKUP_BATCH):
+            existing.update(self.collection.get(ids=ids[start:start + _ID_LOOKUP_BATCH], include=[])['ids'])
+        return existing
+
+    def add_documents(self, documents: List[dict], batch_size: int = 256, parallel: bool = True,
+                      skip_existing: bool = True):
         if not self.collection:
             raise ValueError("Collection not initialized. Call create_or_get_collection first.")
 
@@ -36,39 +232,209 @@ class VectorStore:
             logger.warning("No documents provided to add")
             return
 
+        if skip_existing:
+            # Chroma ignores adds of stored ids anyway, but only after embedding them;
+            # filtering first makes a re-run of an ingestion only embed the new documents
+            existing = self.existing_ids([doc['id'] for doc in documents])
+            if existing:
+                documents = [doc for doc in documents if doc['id'] not in existing]
+                logger.info(f"Skipped {len(existing)} documents already in the collection")
+                if not documents:
+                    return
+
+        # Clear in finally: a failed write may still have stored some batches
         try:
-            self.collection.add(
-                documents=[doc['content'] for doc in documents],
-                metadatas=[doc.get('metadata', {}) for doc in documents],
-                ids=[doc['id'] for doc in documents]
-            )
-            logger.info(f"Added {len(documents)} documents to collection")
-        except Exception as e:
-            logger.error(f"Failed to add documents: {e}")
-            raise
+            self._write_in_batches(self.collection.add, documents, batch_size, "add", parallel)
+        finally:
+            self._invalidate_read_caches()
+        logger.info(f"Added {len(documents)} documents to collection")
+
+    @staticmethod
+    def _copy_results(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        # Callers may edit results or their metadata, so the cache never hands out its own dicts
+        return [{**result, 'metadata': dict(result.get('metadata') or {})} for result in results]
+
+    def _search_cache_get(self, key: tuple) -> Optional[List[Dict[str, Any]]]:
+        with self._search_cache_lock:
+            entry = self._search_cache.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                del self._search_cache[key]
+                entry = None
+            if entry is None:
+                self.search_cache_misses += 1
+                return None
+            self._search_cache.move_to_end(key)
+            self.search_cache_hits += 1
+            return self._copy_results(entry[1])
+
+    def _search_cache_put(self, key: tuple, results: List[Dict[str, Any]]):
+        with self._search_cache_lock:
+            now = time.monotonic()
+            self._search_cache[key] = (now + self._search_cache_ttl, self._copy_results(results))
+            self._search_cache.move_to_end(key)
+            if len(self._search_cache) > self._search_cache_size:
+                # Drop expired entries before evicting live ones
+                for stale in [k for k, (expires, _) in self._search_cache.items() if expires < now]:
+                    del self._search_cache[stale]
+            while len(self._search_cache) > self._search_cache_size:
+                self._search_cache.popitem(last=False)
+
+    def _invalidate_read_caches(self):
+        """Forget cached results and the in-memory index after the collection changes"""
+        with self._search_cache_lock:
+            self._search_cache.clear()
+        self._inmem_index = None
+
+    def build_inmem_index(self):
+        """
+        Load every embedding of the collection into RAM as one unit-normalized float32
+        matrix, so unfiltered searches are a single matrix-vector product instead of a
+        SQLite + HNSW round-trip. Exact (brute force) search, meant for corpora up to
+        ~10^5 chunks. Writes drop the index, searches then go to Chroma until it is rebuilt.
+        With quantization="int8" each row is stored as int8 with its own float32 scale,
+        4x less memory and memory bandwidth per scan for a small loss of score precision
+        """
+        if not self.collection:
+            raise ValueError("Collection not initialized. Call create_or_get_collection first.")
+
+        data = self.collection.get(include=["embeddings", "documents", "metadatas"])
+        embeddings = np.asarray(data["embeddings"], dtype=np.float32)
+        if embeddings.size:
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            np.divide(embeddings, norms, out=embeddings, where=norms > 0)
+        scales = None
+        if self._quantization == "int8" and embeddings.size:
+            # Symmetric per-row quantization: row ~= int8 row * scale
+            scales = np.abs(embeddings).max(axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            embeddings = np.rint(embeddings / scales[:, None]).astype(np.int8)
+            scales = scales.astype(np.float32)
+        # Metadata as columns (structure of arrays), so where filters are vectorized compares
+        metadatas = data["metadatas"] or [None] * len(data["ids"])
+        keys = {key for metadata in metadatas if metadata for key in metadata}
+        columns = {}
+        for key in keys:
+            column = np.empty(len(metadatas), dtype=object)
+            column[:] = [metadata.get(key) if metadata else None for metadata in metadatas]
+            columns[key] = column
+        self._inmem_index = _InMemoryIndex(embeddings, scales, data["ids"], data["documents"], metadatas, columns)
+        logger.info(f"Built in-memory index of {len(data['ids'])} documents")
+
+    def _search_inmem(self, index: _InMemoryIndex, query: str, n_results: int,
+                      mask: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
+        if not index.ids or n_results <= 0:
+            return []
+        query_embedding = np.array(self._query_embeddings.embed_query(query), dtype=np.float32)
+        norm = np.linalg.norm(query_embedding)
+        if norm > 0:
+            query_embedding /= norm
+
+        # Only score the documents a where filter kept
+        candidates = np.arange(len(index.ids)) if mask is None else np.flatnonzero(mask)
+        if not len(candidates):
+            return []
+        embeddings = index.embeddings if mask is None else index.embeddings[candidates]
+
+        # Cosine similarity of unit vectors is their dot product; reported as the cosine
+        # distance (1 - similarity), like the collection's cosine HNSW space
+        if index.scales is None:
+            similarities = embeddings @ query_embedding
+        else:
+            scales = index.scales if mask is None else index.scales[candidates]
+            # Dequantize block by block, the float32 copy never exceeds one block
+            similarities = np.empty(len(candidates), dtype=np.float32)
+            for start in range(0, len(candidates), _DEQUANTIZE_BLOCK):
+                end = start + _DEQUANTIZE_BLOCK
+                block = embeddings[start:end].astype(np.float32)
+                similarities[start:end] = (block @ query_embedding) * scales[start:end]
+        k = min(n_results, len(candidates))
+        top = np.argpartition(-similarities, k - 1)[:k]
+        top = top[np.argsort(-similarities[top])]
+        return [
+            {
+                'id': index.ids[i],
+                'content': index.documents[i],
+                'metadata': index.metadatas[i] or {},
+                'distance': float(1.0 - similarities[j])
+            }
+            for j, i in zip(top, candidates[top])
+        ]
+
+    def _search_literal(self, query: str, n_results: int, where: Optional[Dict]) -> Optional[List[Dict[str, Any]]]:
+        """
+        Results for a literal query without embedding it. None when the query is not
+        literal or nothing matches it literally, so search falls back to a semantic search
+        """
+        stripped = query.strip()
+        if _DOC_ID_RE.fullmatch(stripped):
+            results = self.collection.get(ids=[stripped], where=where, include=["documents", "metadatas"])
+        else:
+            phrase = _QUOTED_PHRASE_RE.fullmatch(stripped)
+            if not phrase:
+                return None
+            results = self.collection.get(where=where, where_document={"$contains": phrase.group(1)},
+                                          limit=n_results, include=["documents", "metadatas"])
+        if not results['ids']:
+            return None
+
+        # Exact matches have no similarity distance
+        metadatas = results['metadatas'] or [None] * len(results['ids'])
+        return [
+            {'id': doc_id, 'content': content, 'metadata': metadata or {}, 'distance': None}
+            for doc_id, content, metadata in zip(results['ids'], results['documents'], metadatas)
+        ]
 
     def search(self, query: str, n_results: int = 5, where: Optional[Dict] = None) -> List[Dict[str, Any]]:
         if not self.collection:
             raise ValueError("Collection not initialized. Call create_or_get_collection first.")
 
+        cache_key = None
+        if self._search_cache_size > 0:
+            # where filters are nested dicts, the sorted JSON form makes them hashable
+            cache_key = (self.collection.name, query, n_results, json.dumps(where, sort_keys=True))
+            cached = self._search_cache_get(cache_key)
+            if cached is not None:
+                logger.debug(f"Search cache hit ({self.search_cache_hits} hits, {self.search_cache_misses} misses)")
+                return cached
+
         try:
+            literal_results = self._search_literal(query, n_results, where)
+            if literal_results is not None:
+                logger.info(f"Literal lookup returned {len(literal_results)} results")
+                return literal_results
+
+            # where filters the in-memory index cannot evaluate go to Chroma
+            index = self._inmem_index
+            mask = None
+            if index is not None and where is not None:
+                mask = _where_mask(index.columns, where, len(index.ids))
+            if index is not None and (where is None or mask is not None):
+                formatted_results = self._search_inmem(index, query, n_results, mask)
+                logger.info(f"In-memory search returned {len(formatted_results)} results")
+                if cache_key is not None:
+                    self._search_cache_put(cache_key, formatted_results)
+                return formatted_results
+
             results = self.collection.query(
-                query_texts=[query],
+                query_embeddings=[self._query_embeddings.embed_query(query)],
                 n_results=n_results,
                 where=where
             )
 
             formatted_results = []
             if results['documents'] and results['documents'][0]:
-                for i in range(len(results['documents'][0])):
-                    formatted_results.append({
-                        'id': results['ids'][0][i],
-                        'content': results['documents'][0][i],
-                        'metadata': results['metadatas'][0][i] if results['metadatas'][0] else {},
-                        'distance': results['distances'][0][i] if results['distances'] else None
-                    })
+                # Unwrap the single-query result lists once, then zip them per hit
+                ids, documents = results['ids'][0], results['documents'][0]
+                metadatas = results['metadatas'][0] or [{}] * len(ids)
+                distances = results['distances'][0] if results['distances'] else [None] * len(ids)
+                formatted_results = [
+                    {'id': doc_id, 'content': content, 'metadata': metadata, 'distance': distance}
+                    for doc_id, content, metadata, distance in zip(ids, documents, metadatas, distances)
+                ]
 
             logger.info(f"Search returned {len(formatted_results)} results")
+            if cache_key is not None:
+                self._search_cache_put(cache_key, formatted_results)
             return formatted_results
         except Exception as e:
             logger.error(f"Search failed: {e}")
@@ -80,12 +446,29 @@ class VectorStore:
 
         try:
             self.collection.delete(ids=ids)
+            self._invalidate_read_caches()
             logger.info(f"Deleted {len(ids)} documents")
         except Exception as e:
             logger.error(f"Failed to delete documents: {e}")
             raise
 
-    def update_documents(self, documents: List[dict]):
+    def clear(self):
+        """Delete every document of the collection, in batches of ids"""
+        if not self.collection:
+            raise ValueError("Collection not initialized. Call create_or_get_collection first.")
+
+        try:
+            ids = self.collection.get(include=[])['ids']
+            for start in range(0, len(ids), _ID_LOOKUP_BATCH):
+                self.collection.delete(ids=ids[start:start + _ID_LOOKUP_BATCH])
+            logger.info(f"Cleared {len(ids)} documents")
+        except Exception as e:
+            logger.error(f"Failed to clear collection: {e}")
+            raise
+        finally:
+            self._invalidate_read_caches()
+
+    def update_documents(self, documents: List[dict], batch_size: int = 256, parallel: bool = True):
         if not self.collection:
             raise ValueError("Collection not initialized. Call create_or_get_collection first.")
 
@@ -94,15 +477,10 @@ class VectorStore:
             return
 
         try:
-            self.collection.update(
-                documents=[doc['content'] for doc in documents],
-                metadatas=[doc.get('metadata', {}) for doc in documents],
-                ids=[doc['id'] for doc in documents]
-            )
-            logger.info(f"Updated {len(documents)} documents")
-        except Exception as e:
-            logger.error(f"Failed to update documents: {e}")
-            raise
+            self._write_in_batches(self.collection.update, documents, batch_size, "update", parallel)
+        finally:
+            self._invalidate_read_caches()
+        logger.info(f"Updated {len(documents)} documents")
 
     def get_collection_info(self) -> Dict[str, Any]:
         if not self.collection:
@@ -1,14 +1,9 @@
 import os
 from dotenv import load_dotenv
-from langchain_community.document_loaders import DirectoryLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+# LangChain, Anthropic and Rich are imported inside the functions that use them,
+# so the welcome banner shows up before the slow imports and the document loader
+# is only imported when the vector store has to be built
 # from langchain_openai import OpenAIEmbeddings, ChatOpenAI
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_community.vectorstores import Chroma
-from langchain.chains import ConversationalRetrievalChain
-from rich.console import Console
-from rich.markdown import Markdown
-from langchain_anthropic import ChatAnthropic
 
 # --- 1. SETUP ---
 # Load environment variables from .env file (for API keys)
@@ -25,6 +20,9 @@ def get_vector_store():
     Creates or loads a persistent vector store from the documentation.
     This is optimized to only process documents once.
     """
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+    from langchain_community.vectorstores import Chroma
+
     # Check if the vector store already exists
     if os.path.exists(PERSIST_DIR):
         # If it exists, load it from disk
@@ -36,6 +34,9 @@ def get_vector_store():
     else:
         # If it doesn't exist, create it
         print("Creating new vector store...")
+        from langchain_community.document_loaders import DirectoryLoader
+        from langchain.text_splitter import RecursiveCharacterTextSplitter
+
         # Load documents from the specified directory
         loader = DirectoryLoader(DOCS_DIR, glob="**/*.md") # Assumes Markdown files
         documents = loader.load()
@@ -60,6 +61,9 @@ def main():
     """
     The main function that runs the interactive command-line interface.
     """
+    from rich.console import Console
+    from rich.markdown import Markdown
+
     console = Console()
     console.print("[bold green]Welcome to the Team Info Agent![/bold green]")
     console.print("Ask a question about the team's documentation, or type 'exit' to quit.")
@@ -68,6 +72,9 @@ def main():
     vector_store = get_vector_store()
 
     # Set up the LLM and the retrieval chain
+    from langchain.chains import ConversationalRetrievalChain
+    from langchain_anthropic import ChatAnthropic
+
     # llm = ChatOpenAI(model_name="gpt-3.5-turbo", temperature=0)
     llm = ChatAnthropic(model="claude-3-5-sonnet-20241022", temperature=0)
     qa_chain = ConversationalRetrievalChain.from_llm(